@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark du parsing des pages capitales : extracteur Next.js
+(crawler/nextdata.py) contre l'ancienne méthode regex du spider.
+
+Pages mesurées, au choix :
+    python bench_nextdata.py --archive .crawl_state/archive.sqlite   # pages Routard archivées (mode record)
+    python bench_nextdata.py --html dublin.html --html rome.html      # pages enregistrées à la main
+    python bench_nextdata.py                                          # page synthétique
+
+Pour chaque page, les deux méthodes sont exécutées --repeat fois sur une réponse
+neuve (pas de sélecteur en cache) ; le temps médian par page est affiché, ainsi
+que l'accord des deux méthodes sur "quand_partir" et "decalage".
+"""
+
+import argparse
+import gzip
+import html
+import json
+import re
+import statistics
+import sys
+import time
+import zlib
+
+from scrapy.http import HtmlResponse
+
+from crawler.nextdata import CapitalGuide, next_payload
+
+
+SYNTHETIC_URL = 'https://www.routard.com/fr/guide/europe/irlande/dublin'
+
+
+def regex_path(response):
+    """Ancienne extraction du spider : regex sur le texte de tous les scripts"""
+    script_content = "".join(response.xpath('//script//text()').getall())
+    all_paragraphs = re.findall(r'\\u003cp\\u003e(.*?)\\u003c/p\\u003e', script_content)
+
+    description_parts = []
+    quand = "Non spécifié"
+    decalage = "Non spécifié"
+    for p in all_paragraphs:
+        clean_p = deep_clean(p)
+        if "Meilleure saison :" in clean_p:
+            match = re.search(r'Meilleure saison\s*:\s*(.*?)(?:\.|\-|Durée|$)', clean_p)
+            if match: quand = match.group(1).strip()
+        if "Décalage horaire :" in clean_p:
+            match = re.search(r'Décalage horaire\s*:\s*(.*?)(?:\.|$)', clean_p)
+            if match: decalage = match.group(1).strip()
+        if len(clean_p) > 100 and "Papiers :" not in clean_p:
+            if clean_p not in description_parts:
+                description_parts.append(clean_p)
+    return {"description": " ".join(description_parts[:2]), "quand_partir": quand, "decalage": decalage}
+
+
+def deep_clean(text):
+    if not text: return ""
+    try:
+        text = text.encode('utf-8').decode('unicode_escape')
+        text = text.encode('latin-1', errors='ignore').decode('utf-8', errors='ignore')
+        text = re.sub(r'<.*?>', '', text)
+        text = html.unescape(text)
+        text = text.replace('â', "'")
+        text = text.replace("ch'teau", "château")
+        return text.strip()
+    except:
+        return text
+
+
+def nextdata_path(response):
+    """Nouvelle extraction : payload Next.js décodé une fois par le parseur JSON"""
+    guide = CapitalGuide(next_payload(response))
+    return {
+        "description": guide.description(),
+        "quand_partir": guide.best_season or "Non spécifié",
+        "decalage": guide.time_difference or "Non spécifié",
+    }
+
+
+def synthetic_page(sections=150):
+    """Page au format Routard : contenu dans __NEXT_DATA__ (< échappés en \\u003c)"""
+    resume = (
+        "<p>Meilleure saison : de mai à septembre. Durée de vol direct (aller) : 1h30.</p>"
+        "<p>Décalage horaire : -1h par rapport à la France.</p>"
+        "<p>Papiers : carte d’identité ou passeport en cours de validité.</p>"
+    )
+    paragraph = ("<p>Section {i} : enfin une capitale à taille humaine, à découvrir à pied, entre "
+                 "quartiers géorgiens, château médiéval et pubs d’époque où l’on s’attarde "
+                 "volontiers &amp; sans se presser.</p>")
+    data = {
+        "props": {"pageProps": {"destination": {
+            "title": "Dublin", "resume": resume,
+            "sections": [
+                {"title": f"Section {i}", "content": paragraph.format(i=i) * 3,
+                 "image": {"src": f"https://www.routard.com/images/{i}.jpg", "alt": "Dublin"},
+                 "links": [{"label": "Voir", "href": f"/guide/dublin/{i}"}] * 4}
+                for i in range(sections)
+            ],
+        }}},
+        "page": "/guide/[...slug]", "buildId": "bench",
+    }
+    payload = json.dumps(data, ensure_ascii=False).replace('<', '\\u003c').replace('>', '\\u003e')
+    # Scripts externes (bundles) et quelques scripts en ligne, lus aussi par la méthode regex
+    scripts = "".join(f'<script src="/_next/static/chunks/{i}.js" defer></script>' for i in range(20))
+    scripts += '<script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments)}</script>'
+    body = (
+        '<html><head><meta name="description" content="Dublin">' + scripts + '</head>'
+        '<body><h1>Voyage Dublin</h1><div id="__next"><main><p>Contenu rendu</p></main></div>'
+        f'<script id="__NEXT_DATA__" type="application/json">{payload}</script></body></html>'
+    )
+    return SYNTHETIC_URL, body.encode('utf-8')
+
+
+def decompress(body, encoding):
+    """Corps archivé tel que reçu : décompression comme le ferait HttpCompressionMiddleware"""
+    encoding = (encoding or b'').lower()
+    if encoding in (b'gzip', b'x-gzip'):
+        return gzip.decompress(body)
+    if encoding == b'deflate':
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    if encoding == b'br':
+        import brotli
+        return brotli.decompress(body)
+    return body
+
+
+def archived_pages(path):
+    from crawler.archive import HttpArchive
+    archive = HttpArchive(path)
+    rows = archive.conn.execute(
+        "SELECT fingerprint FROM responses WHERE status = 200 AND url LIKE '%routard.com%'"
+    ).fetchall()
+    for (fingerprint,) in rows:
+        response = archive.get(fingerprint)
+        yield response.url, decompress(response.body, response.headers.get('Content-Encoding'))
+    archive.close()
+
+
+def measure(parse, url, body, repeat):
+    timings = []
+    for _ in range(repeat):
+        response = HtmlResponse(url=url, body=body, encoding='utf-8')
+        start = time.perf_counter()
+        result = parse(response)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parsing des pages capitales : Next.js contre regex")
+    parser.add_argument('--archive', help="Archive HTTP (crawler/archive.py) contenant des pages Routard")
+    parser.add_argument('--html', action='append', default=[], help="Page HTML enregistrée (répétable)")
+    parser.add_argument('--repeat', type=int, default=50, help="Exécutions par page (défaut : 50)")
+    args = parser.parse_args()
+
+    pages = []
+    if args.archive:
+        pages.extend(archived_pages(args.archive))
+    for path in args.html:
+        with open(path, 'rb') as f:
+            pages.append((SYNTHETIC_URL, f.read()))
+    if not pages:
+        print("ℹ️ Ni --archive ni --html : page synthétique", file=sys.stderr)
+        pages.append(synthetic_page())
+
+    totals = {'regex': 0.0, 'nextdata': 0.0}
+    agree = 0
+    print(f"{'page':<60}{'regex ms':>10}{'nextdata ms':>13}{'gain':>7}")
+    for url, body in pages:
+        regex_time, old = measure(regex_path, url, body, args.repeat)
+        next_time, new = measure(nextdata_path, url, body, args.repeat)
+        totals['regex'] += regex_time
+        totals['nextdata'] += next_time
+        same = all(old[k] == new[k] for k in ('quand_partir', 'decalage'))
+        agree += same
+        print(f"{url[-58:]:<60}{regex_time * 1000:>10.2f}{next_time * 1000:>13.2f}"
+              f"{regex_time / next_time:>6.1f}x{'' if same else '  ⚠️ résultats différents'}")
+
+    count = len(pages)
+    print(f"\n📊 {count} page(s) : regex {totals['regex'] / count * 1000:.2f} ms/page, "
+          f"nextdata {totals['nextdata'] / count * 1000:.2f} ms/page "
+          f"({totals['regex'] / totals['nextdata']:.1f}x)")
+    print(f"✅ Champs identiques sur {agree}/{count} page(s)")
+
+
+if __name__ == "__main__":
+    main()
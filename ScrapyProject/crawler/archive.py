@@ -0,0 +1,168 @@
+"""
+Archive HTTP pour crawler hors ligne (enregistrement / rejeu).
+
+- record : chaque réponse téléchargée est écrite, compressée (zlib), dans une
+  base SQLite indexée par l'empreinte de la requête (HttpArchiveMiddleware) ;
+- replay : un gestionnaire de téléchargement http/https sert les réponses de
+  l'archive, sans réseau ni délai, aux spiders inchangés.
+
+Activé par HTTP_ARCHIVE_MODE ('record' ou 'replay'), archive dans HTTP_ARCHIVE_PATH :
+    scrapy crawl european_capitals -s HTTP_ARCHIVE_MODE=record
+    scrapy crawl european_capitals -s HTTP_ARCHIVE_MODE=replay
+"""
+
+import json
+import os
+import sqlite3
+import zlib
+from datetime import datetime
+
+from twisted.internet import defer
+
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+
+
+ARCHIVE_MODES = ('record', 'replay')
+
+# Rejeu : réglages forcés (pas de réseau, donc ni délai ni régulation)
+REPLAY_SETTINGS = {
+    'DOWNLOAD_DELAY': 0,
+    'CONCURRENT_REQUESTS': 32,
+    'CONCURRENT_REQUESTS_PER_DOMAIN': 32,
+    'ADAPTIVE_THROTTLE_ENABLED': False,
+    'AUTOTHROTTLE_ENABLED': False,
+    # Une réponse d'erreur archivée serait rejouée à l'identique
+    'RETRY_ENABLED': False,
+}
+
+
+class HttpArchive:
+    """Empreinte de requête -> réponse (statut, en-têtes, corps), dans un fichier SQLite"""
+
+    # Écritures regroupées : un commit toutes les COMMIT_EVERY réponses
+    COMMIT_EVERY = 100
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " fingerprint TEXT PRIMARY KEY,"
+            " url TEXT,"
+            " status INTEGER,"
+            " headers BLOB,"
+            " body BLOB,"
+            " recorded_at TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_url ON responses (url)")
+        self.conn.commit()
+        self._pending = 0
+
+    def put(self, fingerprint, response):
+        """Enregistre (ou remplace) la réponse à la requête d'empreinte `fingerprint`"""
+        headers = {
+            name.decode('latin-1'): [value.decode('latin-1') for value in values]
+            for name, values in response.headers.items()
+        }
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (fingerprint, url, status, headers, body, recorded_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                fingerprint,
+                response.url,
+                response.status,
+                zlib.compress(json.dumps(headers).encode('utf-8')),
+                zlib.compress(response.body),
+                datetime.now().isoformat(),
+            )
+        )
+        self._pending += 1
+        if self._pending >= self.COMMIT_EVERY:
+            self.conn.commit()
+            self._pending = 0
+
+    def get(self, fingerprint):
+        """Réponse archivée pour `fingerprint`, ou None"""
+        row = self.conn.execute(
+            "SELECT url, status, headers, body FROM responses WHERE fingerprint = ?",
+            (fingerprint,)
+        ).fetchone()
+        if row is None:
+            return None
+        url, status, headers, body = row
+        headers = Headers(json.loads(zlib.decompress(headers)))
+        body = zlib.decompress(body)
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, status=status, headers=headers, body=body, flags=['archive'])
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class HttpArchiveAddon:
+    """Branche l'enregistrement ou le rejeu selon HTTP_ARCHIVE_MODE (ADDONS)
+
+    Les réglages sont appliqués en priorité 'cmdline' : ils l'emportent sur les
+    custom_settings des spiders (délais du spider Michelin par exemple).
+    """
+
+    def update_settings(self, settings):
+        mode = settings.get('HTTP_ARCHIVE_MODE')
+        if not mode:
+            raise NotConfigured
+        if mode not in ARCHIVE_MODES:
+            raise ValueError(f"HTTP_ARCHIVE_MODE inconnu : {mode!r} (record ou replay)")
+
+        # L'archive doit contenir des réponses complètes, pas des 304
+        settings.set('INCREMENTAL_CRAWL_ENABLED', False, priority='cmdline')
+
+        if mode == 'record':
+            settings['DOWNLOADER_MIDDLEWARES']['crawler.middlewares.HttpArchiveMiddleware'] = 950
+            return
+
+        path = settings.get('HTTP_ARCHIVE_PATH')
+        if not os.path.exists(path):
+            # Sans archive, le rejeu ne doit surtout pas retomber sur le réseau
+            raise ValueError(f"Archive HTTP introuvable : {path} (lancer d'abord le mode record)")
+        for scheme in ('http', 'https'):
+            settings['DOWNLOAD_HANDLERS'][scheme] = 'crawler.archive.HttpArchiveReplayHandler'
+        for name, value in REPLAY_SETTINGS.items():
+            settings.set(name, value, priority='cmdline')
+
+
+class HttpArchiveReplayHandler:
+    """Gestionnaire http/https du mode replay : répond depuis l'archive, jamais depuis le réseau
+
+    API des gestionnaires de Scrapy 2.11 : download_request(request, spider) -> Deferred.
+    """
+
+    lazy = False
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.archive = HttpArchive(crawler.settings.get('HTTP_ARCHIVE_PATH'))
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def download_request(self, request, spider):
+        fingerprint = self.crawler.request_fingerprinter.fingerprint(request).hex()
+        response = self.archive.get(fingerprint)
+        if response is None:
+            self.crawler.stats.inc_value('http_archive/missing')
+            spider.logger.warning(f"📼 Absent de l'archive : {request.url}")
+            return defer.fail(IgnoreRequest(f"Absent de l'archive HTTP : {request.url}"))
+        self.crawler.stats.inc_value('http_archive/replayed')
+        return defer.succeed(response)
+
+    def close(self):
+        self.archive.close()
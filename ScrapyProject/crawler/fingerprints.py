@@ -0,0 +1,80 @@
+"""
+Mémoire persistante des pages déjà crawlées, pour le crawl incrémental.
+
+Une base SQLite locale associe à chaque URL les validateurs HTTP reçus (ETag,
+Last-Modified) et l'empreinte du corps de la dernière réponse.
+"""
+
+import hashlib
+import os
+import sqlite3
+from datetime import datetime
+
+from scrapy import signals
+
+
+class PageFingerprintStore:
+    """URL -> (ETag, Last-Modified, empreinte du corps), dans un fichier SQLite"""
+
+    # Écritures regroupées : un commit toutes les COMMIT_EVERY mises à jour
+    COMMIT_EVERY = 100
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " body_hash TEXT,"
+            " fetched_at TEXT)"
+        )
+        self.conn.commit()
+        self._pending = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Base unique du crawl, partagée par les middlewares du crawl incrémental
+
+        Deux connexions sur le même fichier se bloqueraient : chacune garde une
+        transaction d'écriture ouverte jusqu'à COMMIT_EVERY mises à jour.
+        """
+        store = getattr(crawler, 'page_fingerprint_store', None)
+        if store is None:
+            store = crawler.page_fingerprint_store = cls(crawler.settings.get('INCREMENTAL_CRAWL_DB'))
+            crawler.signals.connect(store.spider_closed, signal=signals.spider_closed)
+        return store
+
+    @staticmethod
+    def body_hash(body):
+        return hashlib.sha1(body).hexdigest()
+
+    def get(self, url):
+        """Dictionnaire des validateurs connus pour `url`, ou None"""
+        row = self.conn.execute(
+            "SELECT etag, last_modified, body_hash FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'body_hash': row[2]}
+
+    def put(self, url, etag, last_modified, body_hash):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages (url, etag, last_modified, body_hash, fetched_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (url, etag, last_modified, body_hash, datetime.now().isoformat())
+        )
+        self._pending += 1
+        if self._pending >= self.COMMIT_EVERY:
+            self.conn.commit()
+            self._pending = 0
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def spider_closed(self, spider):
+        self.close()
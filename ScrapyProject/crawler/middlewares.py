@@ -3,11 +3,19 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.utils.httpobj import urlparse_cached
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
+from crawler.fingerprints import PageFingerprintStore
+
 
 class CrawlerSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -57,47 +65,370 @@ class CrawlerSpiderMiddleware:
 
 
 class CrawlerDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+    """Régulation adaptative (AIMD) du débit, domaine par domaine
+
+    Pour chaque slot de téléchargement (un par domaine), le middleware suit la
+    latence des réponses et les refus du serveur (429 / 503, erreurs réseau),
+    puis ajuste le délai et la concurrence du slot entre les bornes configurées :
+
+    - augmentation additive : après ADAPTIVE_THROTTLE_WINDOW réponses sans refus
+      et de latence moyenne sous la cible, le délai baisse d'un pas, puis, une
+      fois au minimum, la concurrence augmente d'une requête ;
+    - diminution multiplicative : au premier refus (ou latence trop élevée), la
+      concurrence est divisée par deux et le délai doublé ;
+    - un en-tête Retry-After suspend le domaine pendant la durée demandée.
+
+    Les refus de requêtes envoyées avant la dernière diminution sont ignorés :
+    elles étaient parties au rythme précédent. Remplace AutoThrottle, activé par
+    ADAPTIVE_THROTTLE_ENABLED ; DOWNLOAD_DELAY sert de valeur de départ, et
+    CONCURRENT_REQUESTS_PER_DOMAIN de valeur de départ et de plafond.
+    """
+
+    THROTTLE_CODES = (429, 503)
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        settings = crawler.settings
+        self.min_delay = settings.getfloat('ADAPTIVE_THROTTLE_MIN_DELAY')
+        self.max_delay = settings.getfloat('ADAPTIVE_THROTTLE_MAX_DELAY')
+        self.delay_step = settings.getfloat('ADAPTIVE_THROTTLE_DELAY_STEP')
+        self.min_concurrency = settings.getint('ADAPTIVE_THROTTLE_MIN_CONCURRENCY')
+        self.max_concurrency = settings.getint('ADAPTIVE_THROTTLE_MAX_CONCURRENCY')
+        # Jamais au-delà de la concurrence demandée (ex: -a concurrency du spider Michelin)
+        per_domain = settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN')
+        if per_domain > 0:
+            self.max_concurrency = min(self.max_concurrency, per_domain)
+            self.min_concurrency = min(self.min_concurrency, self.max_concurrency)
+        self.target_latency = settings.getfloat('ADAPTIVE_THROTTLE_TARGET_LATENCY')
+        self.window = settings.getint('ADAPTIVE_THROTTLE_WINDOW')
+        self.max_retry_after = settings.getfloat('ADAPTIVE_THROTTLE_MAX_RETRY_AFTER')
+        # État par slot : fenêtre de mesure, génération, pause Retry-After
+        self.domains = {}
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
+        if not crawler.settings.getbool('ADAPTIVE_THROTTLE_ENABLED'):
+            raise NotConfigured
+        s = cls(crawler)
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
         return s
 
+    def _domain(self, key):
+        return self.domains.setdefault(key, {
+            'epoch': 0,            # incrémentée à chaque diminution
+            'responses': 0,        # réponses de la fenêtre en cours
+            'latency': 0.0,        # somme des latences de la fenêtre
+            'paused_until': None,  # fin de la pause Retry-After
+            'resume_delay': None,  # délai à rétablir après la pause
+            'delay': None,         # derniers réglages appliqués (bilan)
+            'concurrency': None,
+        })
+
+    @staticmethod
+    def _slot_key(request):
+        # Même clé que le Downloader : le slot n'est posé dans meta qu'à la mise
+        # en file, après process_request, d'où le repli sur le nom d'hôte
+        key = request.meta.get('download_slot')
+        if key is None:
+            key = urlparse_cached(request).hostname or ''
+        return key
+
+    def _slot(self, request):
+        key = request.meta.get('download_slot')
+        if key is None:
+            return None, None
+        return key, self.crawler.engine.downloader.slots.get(key)
+
     def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
-
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
+        # Génération du domaine au départ de la requête
+        key = self._slot_key(request)
+        request.meta['throttle_epoch'] = self._domain(key)['epoch']
         return None
 
     def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
+        key, slot = self._slot(request)
+        latency = request.meta.get('download_latency')
+        if slot is None or latency is None:
+            # Réponse sans téléchargement (cache HTTP, archive...)
+            return response
+        state = self._domain(key)
+        self._end_pause(key, slot, state, spider)
 
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
+        if response.status in self.THROTTLE_CODES:
+            retry_after = self.parse_retry_after(response.headers.get('Retry-After'))
+            self._decrease(key, slot, state, request, spider,
+                           f"HTTP {response.status}", retry_after)
+            return response
+
+        state['responses'] += 1
+        state['latency'] += latency
+        if state['responses'] >= self.window:
+            average = state['latency'] / state['responses']
+            if average > self.target_latency:
+                self._decrease(key, slot, state, request, spider,
+                               f"latence moyenne {average:.2f}s")
+            else:
+                self._increase(key, slot, state, spider, average)
         return response
 
     def process_exception(self, request, exception, spider):
-        # Called when a download handler or a process_request()
-        # (from other downloader middleware) raises an exception.
+        if isinstance(exception, IgnoreRequest):
+            return None
+        key, slot = self._slot(request)
+        if slot is not None:
+            self._decrease(key, slot, self._domain(key), request, spider,
+                           type(exception).__name__)
+        return None
 
-        # Must either:
-        # - return None: continue processing this exception
-        # - return a Response object: stops process_exception() chain
-        # - return a Request object: stops process_exception() chain
-        pass
+    def _increase(self, key, slot, state, spider, average):
+        old_delay, old_concurrency = slot.delay, slot.concurrency
+        if slot.delay > self.min_delay:
+            slot.delay = max(self.min_delay, slot.delay - self.delay_step)
+        elif slot.concurrency < self.max_concurrency:
+            slot.concurrency += 1
+        self._reset_window(state)
+        self._remember(slot, state)
+        if (slot.delay, slot.concurrency) != (old_delay, old_concurrency):
+            self.stats.inc_value('adaptive_throttle/increases')
+            spider.logger.info(
+                f"🐇 {key} : latence moyenne {average:.2f}s, délai {old_delay:.2f}s -> "
+                f"{slot.delay:.2f}s, concurrence {old_concurrency} -> {slot.concurrency}"
+            )
+
+    def _decrease(self, key, slot, state, request, spider, reason, retry_after=None):
+        # Requête partie avant la dernière diminution : déjà prise en compte
+        if request.meta.get('throttle_epoch', state['epoch']) < state['epoch']:
+            return
+        old_delay, old_concurrency = slot.delay, slot.concurrency
+        slot.concurrency = max(self.min_concurrency, slot.concurrency // 2)
+        slot.delay = min(self.max_delay, max(self.min_delay, slot.delay * 2))
+        state['epoch'] += 1
+        self._reset_window(state)
+        self._remember(slot, state)
+        self.stats.inc_value('adaptive_throttle/decreases')
+        spider.logger.info(
+            f"🐢 {key} : {reason}, délai {old_delay:.2f}s -> {slot.delay:.2f}s, "
+            f"concurrence {old_concurrency} -> {slot.concurrency}"
+        )
+
+        if retry_after:
+            retry_after = min(retry_after, self.max_retry_after)
+            # Pause : la prochaine requête du slot attend retry_after secondes,
+            # le délai normal est rétabli à l'arrivée de sa réponse
+            state['resume_delay'] = slot.delay
+            state['paused_until'] = time.monotonic() + retry_after
+            slot.delay = max(slot.delay, retry_after)
+            self.stats.inc_value('adaptive_throttle/retry_after')
+            spider.logger.info(f"⏸️ {key} : Retry-After, pause de {retry_after:.0f}s")
+
+    def _end_pause(self, key, slot, state, spider):
+        if state['paused_until'] is None or time.monotonic() < state['paused_until']:
+            return
+        slot.delay = state['resume_delay']
+        state['paused_until'] = state['resume_delay'] = None
+        self._remember(slot, state)
+        spider.logger.info(f"▶️ {key} : reprise, délai {slot.delay:.2f}s")
+
+    @staticmethod
+    def _remember(slot, state):
+        state['delay'] = slot.delay
+        state['concurrency'] = slot.concurrency
+
+    @staticmethod
+    def _reset_window(state):
+        state['responses'] = 0
+        state['latency'] = 0.0
+
+    @staticmethod
+    def parse_retry_after(value):
+        """Secondes d'attente d'un en-tête Retry-After (nombre ou date HTTP), ou None"""
+        if not value:
+            return None
+        value = value.decode('latin-1').strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
 
     def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
+        spider.logger.info(
+            f"🚦 Régulation adaptative : délai {self.min_delay}-{self.max_delay}s, "
+            f"concurrence {self.min_concurrency}-{self.max_concurrency} par domaine"
+        )
+
+    def spider_closed(self, spider):
+        for key, state in self.domains.items():
+            if state['delay'] is not None:
+                spider.logger.info(
+                    f"🚦 {key} : délai final {state['delay']:.2f}s, "
+                    f"concurrence {state['concurrency']}"
+                )
+
+
+class IncrementalCrawlMiddleware:
+    """Crawl incrémental : ne télécharge et ne parse que les pages modifiées
+
+    Concerne les pages "feuilles" : requêtes avec meta['incremental'] = True, ou
+    dont le callback figure dans l'attribut incremental_callbacks du spider. Les
+    pages de listing, qui mènent aux autres, sont toujours téléchargées.
+
+    - envoie If-None-Match / If-Modified-Since d'après la dernière réponse ;
+    - un 304, ou un corps d'empreinte identique, est abandonné (IgnoreRequest)
+      avant d'atteindre le callback ;
+    - l'empreinte d'une page modifiée n'est enregistrée qu'une fois son callback
+      terminé sans erreur (IncrementalCommitMiddleware) ;
+    - le bilan (inchangées / modifiées / nouvelles) est écrit en fin de crawl.
+
+    Activé par INCREMENTAL_CRAWL_ENABLED, base dans INCREMENTAL_CRAWL_DB.
+    """
+
+    def __init__(self, store, stats):
+        self.store = store
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('INCREMENTAL_CRAWL_ENABLED'):
+            raise NotConfigured
+        s = cls(PageFingerprintStore.from_crawler(crawler), crawler.stats)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def is_incremental(self, request, spider):
+        if 'incremental' in request.meta:
+            return request.meta['incremental']
+        callback = request.callback or getattr(spider, 'parse', None)
+        return getattr(callback, '__name__', None) in getattr(spider, 'incremental_callbacks', ())
+
+    def process_request(self, request, spider):
+        if not self.is_incremental(request, spider):
+            return None
+        known = self.store.get(request.url)
+        if known:
+            if known['etag'] and 'If-None-Match' not in request.headers:
+                request.headers['If-None-Match'] = known['etag']
+            if known['last_modified'] and 'If-Modified-Since' not in request.headers:
+                request.headers['If-Modified-Since'] = known['last_modified']
+        return None
+
+    def process_response(self, request, response, spider):
+        if not self.is_incremental(request, spider):
+            return response
+
+        if response.status == 304:
+            self.stats.inc_value('incremental/unchanged_304')
+            raise IgnoreRequest(f"Page inchangée (304): {request.url}")
+        if response.status != 200:
+            return response
+
+        known = self.store.get(request.url)
+        fingerprint = (
+            request.url,
+            self._header(response, 'ETag'),
+            self._header(response, 'Last-Modified'),
+            PageFingerprintStore.body_hash(response.body)
+        )
+        # Serveur sans requêtes conditionnelles : on compare le contenu
+        if known and known['body_hash'] == fingerprint[3]:
+            self.store.put(*fingerprint)
+            self.stats.inc_value('incremental/unchanged_hash')
+            raise IgnoreRequest(f"Page inchangée (empreinte): {request.url}")
+
+        # Enregistrée seulement si le callback réussit : une erreur de parsing ne
+        # doit pas faire passer la page pour inchangée aux crawls suivants
+        request.meta['incremental_fingerprint'] = fingerprint
+        self.stats.inc_value('incremental/changed' if known else 'incremental/new')
+        return response
+
+    @staticmethod
+    def _header(response, name):
+        value = response.headers.get(name)
+        return value.decode('latin-1') if value else None
+
+    def spider_closed(self, spider):
+        count = {k: self.stats.get_value(f'incremental/{k}', 0)
+                 for k in ('unchanged_304', 'unchanged_hash', 'changed', 'new')}
+        unchanged = count['unchanged_304'] + count['unchanged_hash']
+        self.stats.set_value('incremental/unchanged', unchanged)
+        spider.logger.info(
+            f"♻️ Crawl incrémental : {unchanged} page(s) inchangée(s) "
+            f"(304 : {count['unchanged_304']}, même contenu : {count['unchanged_hash']}), "
+            f"{count['changed']} modifiée(s), {count['new']} nouvelle(s)"
+        )
+
+
+class IncrementalCommitMiddleware:
+    """Crawl incrémental, côté spider : enregistre l'empreinte d'une page modifiée
+    une fois son callback terminé sans erreur
+
+    L'empreinte est déposée dans meta['incremental_fingerprint'] par
+    IncrementalCrawlMiddleware ; si le callback lève une exception, rien n'est
+    enregistré et la page sera de nouveau parsée au prochain crawl.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('INCREMENTAL_CRAWL_ENABLED'):
+            raise NotConfigured
+        # Même base que IncrementalCrawlMiddleware, fermée en fin de crawl
+        return cls(PageFingerprintStore.from_crawler(crawler))
+
+    def process_spider_output(self, response, result, spider):
+        yield from result
+        self._commit(response)
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for r in result:
+            yield r
+        self._commit(response)
+
+    def _commit(self, response):
+        fingerprint = response.meta.get('incremental_fingerprint')
+        if fingerprint:
+            self.store.put(*fingerprint)
+
+
+class HttpArchiveMiddleware:
+    """Mode record de l'archive HTTP : enregistre chaque réponse téléchargée
+
+    Ajouté par HttpArchiveAddon quand HTTP_ARCHIVE_MODE = 'record'. Placé au plus
+    près du téléchargement : la réponse est archivée telle que reçue (corps
+    encore compressé), le rejeu repasse donc par les mêmes middlewares.
+    """
+
+    def __init__(self, archive, fingerprinter, stats):
+        self.archive = archive
+        self.fingerprinter = fingerprinter
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        # Import local : l'archive n'est chargée qu'en mode record
+        from crawler.archive import HttpArchive
+        archive = HttpArchive(crawler.settings.get('HTTP_ARCHIVE_PATH'))
+        s = cls(archive, crawler.request_fingerprinter, crawler.stats)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def process_response(self, request, response, spider):
+        # Réponses déjà issues d'un cache : rien à archiver
+        if 'cached' not in response.flags and 'archive' not in response.flags:
+            self.archive.put(self.fingerprinter.fingerprint(request).hex(), response)
+            self.stats.inc_value('http_archive/recorded')
+        return response
+
+    def spider_closed(self, spider):
+        recorded = self.stats.get_value('http_archive/recorded', 0)
+        total = len(self.archive)
+        self.archive.close()
+        spider.logger.info(f"📼 Archive HTTP : {recorded} réponse(s) enregistrée(s), {total} au total")
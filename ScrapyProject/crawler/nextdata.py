@@ -0,0 +1,220 @@
+"""
+Extraction des données Next.js des pages du Routard.
+
+Le contenu des pages (résumé, infos pratiques) n'est pas dans le HTML rendu mais
+dans les données embarquées par Next.js :
+- <script id="__NEXT_DATA__"> : un objet JSON (Pages Router) ;
+- self.__next_f.push([1, "..."]) : le flux RSC découpé en morceaux (App Router).
+
+Le payload est décodé une seule fois par un parseur JSON : les chaînes HTML
+sont alors déjà propres (ni séquences \\u003c, ni double décodage).
+"""
+
+import html
+import json
+import re
+
+
+NEXT_DATA_XPATH = '//script[@id="__NEXT_DATA__"]/text()'
+FLIGHT_XPATH = '//script[contains(text(), "self.__next_f.push")]/text()'
+FLIGHT_PUSH = re.compile(r'self\.__next_f\.push\((.*)\)\s*;?\s*$', re.S)
+# Ligne du flux RSC de type texte ("$<id>" dans les autres lignes)
+FLIGHT_REFERENCE = re.compile(r'^\$([0-9a-f]+)$')
+FLIGHT_TAG = re.compile(r'^[A-Z]*')
+
+PARAGRAPH = re.compile(r'<p(?:\s[^>]*)?>(.*?)</p>', re.S)
+TAG = re.compile(r'<[^>]+>')
+SPACES = re.compile(r'\s+')
+
+# Infos pratiques du résumé : "Meilleure saison : ...", "Décalage horaire : ..."
+FIELD_PATTERNS = {
+    'best_season': re.compile(r'Meilleure saison\s*:\s*(.*?)(?:\.|\-|Durée|$)'),
+    'time_difference': re.compile(r'Décalage horaire\s*:\s*(.*?)(?:\.|$)'),
+    'flight_time': re.compile(r'Durée de vol direct[^:]*:\s*([^.]+)', re.IGNORECASE),
+    'papers': re.compile(r'Papiers\s*:\s*([^.]+)', re.IGNORECASE),
+}
+
+
+def next_payload(response):
+    """Payload Next.js de la page (objet JSON ou lignes du flux RSC), ou None"""
+    data = response.xpath(NEXT_DATA_XPATH).get()
+    if data:
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    chunks = []
+    for script in response.xpath(FLIGHT_XPATH).getall():
+        match = FLIGHT_PUSH.search(script.strip())
+        if not match:
+            continue
+        try:
+            chunk = json.loads(match.group(1))
+        except ValueError:
+            continue
+        # [1, "..."] : morceau du flux ; les autres types (amorçage, formulaires) sont ignorés
+        if len(chunk) > 1 and chunk[0] == 1 and isinstance(chunk[1], str):
+            chunks.append(chunk[1])
+    if not chunks:
+        return None
+    return parse_flight(''.join(chunks))
+
+
+def parse_flight(text):
+    """Décode un flux RSC ("<id>:<valeur>" par ligne) en liste de valeurs JSON
+
+    Les lignes texte ("<id>:T<taille>,<texte>", taille en octets) sont
+    substituées aux références "$<id>" qui les désignent.
+    """
+    data = text.encode('utf-8')
+    rows, texts = [], {}
+    pos = 0
+    while pos < len(data):
+        colon = data.find(b':', pos)
+        if colon < 0:
+            break
+        row_id = data[pos:colon].decode('utf-8', errors='replace').strip()
+        if data[colon + 1:colon + 2] == b'T':
+            comma = data.find(b',', colon)
+            try:
+                length = int(data[colon + 2:comma], 16)
+            except ValueError:
+                break
+            texts[row_id] = data[comma + 1:comma + 1 + length].decode('utf-8', errors='replace')
+            pos = comma + 1 + length
+            continue
+        end = data.find(b'\n', colon)
+        if end < 0:
+            end = len(data)
+        rows.append(_flight_value(data[colon + 1:end].decode('utf-8', errors='replace')))
+        pos = end + 1
+    return [_resolve(value, texts) for value in rows]
+
+
+def _flight_value(raw):
+    # Préfixe de type éventuel (I = module, HL = préchargement, E = erreur...)
+    raw = raw[FLIGHT_TAG.match(raw).end():]
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def _resolve(value, texts):
+    if isinstance(value, str):
+        match = FLIGHT_REFERENCE.match(value)
+        return texts.get(match.group(1), value) if match else value
+    if isinstance(value, dict):
+        return {key: _resolve(item, texts) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve(item, texts) for item in value]
+    return value
+
+
+def iter_strings(value):
+    """Toutes les chaînes du payload, dans l'ordre du document"""
+    # Parcours itératif : pas de chaîne de générateurs imbriqués sur les payloads profonds
+    stack = [iter((value,))]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, str):
+                yield item
+            elif isinstance(item, dict):
+                stack.append(iter(item.values()))
+                break
+            elif isinstance(item, list):
+                stack.append(iter(item))
+                break
+        else:
+            stack.pop()
+
+
+def find_key(value, key):
+    """Première valeur associée à `key` dans le payload (parcours en profondeur), ou None"""
+    if isinstance(value, dict):
+        if key in value:
+            return value[key]
+        children = value.values()
+    elif isinstance(value, list):
+        children = value
+    else:
+        return None
+    for child in children:
+        found = find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def clean_html(fragment):
+    """Texte d'un fragment HTML : balises retirées, entités décodées, espaces normalisés"""
+    return SPACES.sub(' ', html.unescape(TAG.sub(' ', fragment))).strip()
+
+
+class CapitalGuide:
+    """Champs d'une page capitale, lus dans le payload Next.js
+
+    resume          : texte du bloc "resume" (infos pratiques), ou None
+    best_season     : meilleure saison, ou None (de même pour les champs suivants)
+    time_difference : décalage horaire
+    flight_time     : durée de vol direct
+    papers          : papiers nécessaires
+
+    Les champs sont cherchés dans le résumé, puis dans le reste de la page s'il
+    en manque ; les paragraphes ne sont nettoyés qu'au fur et à mesure du besoin.
+    """
+
+    def __init__(self, payload):
+        self.payload = payload
+        resume = find_key(payload, 'resume')
+        self.resume = clean_html(resume) if isinstance(resume, str) else None
+
+        found = {}
+        if isinstance(resume, str):
+            self._search(self._paragraphs_of(resume), found)
+            self._search([self.resume], found)
+        if len(found) < len(FIELD_PATTERNS):
+            self._search(self.iter_paragraphs(), found)
+        for field in FIELD_PATTERNS:
+            setattr(self, field, found.get(field))
+
+    @staticmethod
+    def _paragraphs_of(fragment):
+        for paragraph in PARAGRAPH.findall(fragment):
+            paragraph = clean_html(paragraph)
+            if paragraph:
+                yield paragraph
+
+    @staticmethod
+    def _search(texts, found):
+        for text in texts:
+            for field, pattern in FIELD_PATTERNS.items():
+                if field in found:
+                    continue
+                match = pattern.search(text)
+                if match and match.group(1).strip():
+                    found[field] = match.group(1).strip()
+            if len(found) == len(FIELD_PATTERNS):
+                return
+
+    def iter_paragraphs(self):
+        """Paragraphes <p> de toute la page, nettoyés et dédoublonnés, dans l'ordre"""
+        seen = set()
+        for value in iter_strings(self.payload):
+            if '<p' not in value:
+                continue
+            for paragraph in self._paragraphs_of(value):
+                if paragraph not in seen:
+                    seen.add(paragraph)
+                    yield paragraph
+
+    def description(self, count=2, min_length=100):
+        """Les `count` premiers paragraphes longs, hors infos administratives"""
+        parts = []
+        for paragraph in self.iter_paragraphs():
+            if len(paragraph) > min_length and "Papiers :" not in paragraph:
+                parts.append(paragraph)
+                if len(parts) == count:
+                    break
+        return " ".join(parts)
@@ -3,8 +3,16 @@ import re
 from datetime import datetime
 
 class RoutardPipeline:
+    def __init__(self, path='data_capitale_complete.json'):
+        self.path = path
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        # Fichier complet, ou delta d'un crawl incrémental (voir EuropeanCapitalsSpider)
+        return cls(crawler.settings.get('ROUTARD_OUTPUT_FILE'))
+
     def open_spider(self, spider):
-        self.file = open('data_capitale_complete.json', 'w', encoding='utf-8')
+        self.file = open(self.path, 'w', encoding='utf-8')
         self.file.write('[\n')
         self.first_item = True
 
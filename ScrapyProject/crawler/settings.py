@@ -12,11 +12,10 @@ COMPRESSION_ENABLED = True
 # User-Agent réaliste
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 
-# Délais et concurrence
+# Délais et concurrence (valeurs de départ, ajustées ensuite par domaine)
 CONCURRENT_REQUESTS = 4
 DOWNLOAD_DELAY = 3
 CONCURRENT_REQUESTS_PER_DOMAIN = 2
-CONCURRENT_REQUESTS_PER_IP = 2
 
 # Cookies
 COOKIES_ENABLED = True
@@ -43,12 +42,25 @@ EXTENSIONS = {
 ITEM_PIPELINES = {
     'crawler.pipelines.RoutardPipeline': 300,
 }
+# Jeu complet écrit par RoutardPipeline, lu par l'import
+ROUTARD_OUTPUT_FILE = 'data_capitale_complete.json'
 
 # Downloader Middlewares - IMPORTANT POUR LA DÉCOMPRESSION
 DOWNLOADER_MIDDLEWARES = {
     'scrapy.downloadermiddlewares.httpcompression.HttpCompressionMiddleware': 810,
     'scrapy.downloadermiddlewares.useragent.UserAgentMiddleware': None,
     'scrapy.downloadermiddlewares.retry.RetryMiddleware': 90,
+    # Avant la décompression (810) côté requête, après côté réponse : l'empreinte
+    # porte sur le corps décompressé
+    'crawler.middlewares.IncrementalCrawlMiddleware': 800,
+    # Voit les réponses avant RetryMiddleware (90) et le crawl incrémental (800)
+    'crawler.middlewares.CrawlerDownloaderMiddleware': 860,
+}
+
+# Spider Middlewares
+SPIDER_MIDDLEWARES = {
+    # Au plus près du spider : l'empreinte n'est enregistrée qu'après le callback
+    'crawler.middlewares.IncrementalCommitMiddleware': 950,
 }
 
 # Retry settings
@@ -56,14 +68,37 @@ RETRY_ENABLED = True
 RETRY_TIMES = 3
 RETRY_HTTP_CODES = [500, 502, 503, 504, 522, 524, 408, 429]
 
+# Régulation adaptative par domaine (CrawlerDownloaderMiddleware), remplace AutoThrottle
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_MIN_DELAY = 0.25
+ADAPTIVE_THROTTLE_MAX_DELAY = 30
+ADAPTIVE_THROTTLE_DELAY_STEP = 0.25
+ADAPTIVE_THROTTLE_MIN_CONCURRENCY = 1
+ADAPTIVE_THROTTLE_MAX_CONCURRENCY = 4
+# Latence moyenne (s) au-delà de laquelle le débit est réduit
+ADAPTIVE_THROTTLE_TARGET_LATENCY = 2.0
+# Nombre de réponses entre deux augmentations
+ADAPTIVE_THROTTLE_WINDOW = 10
+# Attente maximale accordée à un en-tête Retry-After (s)
+ADAPTIVE_THROTTLE_MAX_RETRY_AFTER = 300
+
 # AutoThrottle
-AUTOTHROTTLE_ENABLED = True
-AUTOTHROTTLE_START_DELAY = 3
-AUTOTHROTTLE_MAX_DELAY = 10
-AUTOTHROTTLE_TARGET_CONCURRENCY = 2.0
-AUTOTHROTTLE_DEBUG = False
+AUTOTHROTTLE_ENABLED = False
 
 # HTTP Cache
+# Crawl incrémental (recrawls nocturnes) : scrapy crawl ... -s INCREMENTAL_CRAWL_ENABLED=1
+# Les fiches déjà vues et inchangées ne sont ni re-téléchargées ni re-parsées
+INCREMENTAL_CRAWL_ENABLED = False
+INCREMENTAL_CRAWL_DB = '.crawl_state/pages.sqlite'
+
+# Archive HTTP (crawl hors ligne, tests de non-régression, mesure des parseurs)
+# scrapy crawl ... -s HTTP_ARCHIVE_MODE=record, puis -s HTTP_ARCHIVE_MODE=replay
+ADDONS = {
+    'crawler.archive.HttpArchiveAddon': 0,
+}
+HTTP_ARCHIVE_MODE = ''
+HTTP_ARCHIVE_PATH = '.crawl_state/archive.sqlite'
+
 HTTPCACHE_ENABLED = False
 HTTPCACHE_EXPIRATION_SECS = 86400
 HTTPCACHE_DIR = 'httpcache'
@@ -1,10 +1,15 @@
 import scrapy
-import re
-import html
 from datetime import datetime
 
+from crawler.nextdata import CapitalGuide, next_payload
+
+# Crawl incrémental : seules les capitales modifiées sont émises, dans un fichier à part
+DELTA_OUTPUT_FILE = 'data_capitale_delta_{time}.json'
+
 class EuropeanCapitalsSpider(scrapy.Spider):
     name = 'european_capitals'
+    # Pages ignorées si inchangées (crawl incrémental, IncrementalCrawlMiddleware)
+    incremental_callbacks = ('parse',)
     
     # Ajoute ici toutes tes URLs
     start_urls = [
@@ -26,59 +31,34 @@ class EuropeanCapitalsSpider(scrapy.Spider):
         'https://www.routard.com/fr/guide/europe/chypre/nicosie',
     ]
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # Un crawl incrémental n'émet que les pages modifiées : RoutardPipeline ne
+        # doit pas écraser le jeu complet (l'archive HTTP désactive l'incrémental)
+        settings = crawler.settings
+        if settings.getbool('INCREMENTAL_CRAWL_ENABLED') and not settings.get('HTTP_ARCHIVE_MODE'):
+            time = datetime.now().strftime('%Y-%m-%dT%H-%M-%S')
+            settings.set('ROUTARD_OUTPUT_FILE', DELTA_OUTPUT_FILE.format(time=time), priority='spider')
+        return spider
+
     def parse(self, response):
         # Nettoyage du nom de la capitale (enlève "Voyage ")
         raw_title = response.xpath('//h1/text()').get() or "Dublin"
         capitale = raw_title.replace("Voyage ", "").strip()
-        
-        script_content = "".join(response.xpath('//script//text()').getall())
-        
-        # 1. Récupération des paragraphes
-        all_paragraphs = re.findall(r'\\u003cp\\u003e(.*?)\\u003c/p\\u003e', script_content)
-        
-        description_parts = []
-        quand = "Non spécifié"
-        decalage = "Non spécifié"
-        
-        for p in all_paragraphs:
-            clean_p = self.deep_clean(p)
-            
-            # Extraction Meilleure saison
-            if "Meilleure saison :" in clean_p:
-                match = re.search(r'Meilleure saison\s*:\s*(.*?)(?:\.|\-|Durée|$)', clean_p)
-                if match: quand = match.group(1).strip()
-                
-            # Extraction Décalage
-            if "Décalage horaire :" in clean_p:
-                match = re.search(r'Décalage horaire\s*:\s*(.*?)(?:\.|$)', clean_p)
-                if match: decalage = match.group(1).strip()
-            
-            # Construction de la description (paragraphes longs uniquement)
-            if len(clean_p) > 100 and "Papiers :" not in clean_p:
-                if clean_p not in description_parts:
-                    description_parts.append(clean_p)
+
+        # Données Next.js de la page, décodées une seule fois (crawler/nextdata.py)
+        payload = next_payload(response)
+        if payload is None:
+            self.logger.warning(f"⚠️ Données Next.js introuvables : {response.url}")
+        guide = CapitalGuide(payload)
 
         yield {
             "capitale": capitale,
-            "description": " ".join(description_parts[:2]),
-            "quand_partir": quand,
-            "decalage": decalage,
+            # Paragraphes longs uniquement
+            "description": guide.description(),
+            "quand_partir": guide.best_season or "Non spécifié",
+            "decalage": guide.time_difference or "Non spécifié",
             "url": response.url,
             "date_scraping": datetime.now().strftime("%d/%m/%Y")
         }
-
-    def deep_clean(self, text):
-        if not text: return ""
-        try:
-            # Réparation de l'encodage
-            text = text.encode('utf-8').decode('unicode_escape')
-            text = text.encode('latin-1', errors='ignore').decode('utf-8', errors='ignore')
-            # Nettoyage HTML
-            text = re.sub(r'<.*?>', '', text)
-            text = html.unescape(text)
-            # Corrections spécifiques finales
-            text = text.replace('â', "'") # Pour les apostrophes
-            text = text.replace("ch'teau", "château") # Correction manuelle du bug restant
-            return text.strip()
-        except:
-            return text
\ No newline at end of file
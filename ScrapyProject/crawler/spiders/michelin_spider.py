@@ -1,12 +1,25 @@
 import scrapy
 from datetime import datetime
+import heapq
 import re
 
+# Instantané complet, lu par import_data.sh et l'image Docker
+FULL_FEED = 'michelin_restaurants.json'
+# Crawl incrémental : seules les fiches modifiées sont émises, dans un fichier à part
+DELTA_FEED = 'michelin_restaurants_delta_%(time)s.json'
+FEED_OPTIONS = {
+    'format': 'json',
+    'encoding': 'utf-8',
+    'indent': 4,
+}
+
 class MichelinSpider(scrapy.Spider):
     """Spider pour scraper les restaurants du Guide Michelin"""
 
     name = "michelin_spider"
     allowed_domains = ["guide.michelin.com"]
+    # Fiches ignorées si inchangées (crawl incrémental, IncrementalCrawlMiddleware)
+    incremental_callbacks = ('parse_detail',)
 
     # URLs des capitales européennes
     start_urls = [
@@ -23,74 +36,184 @@ class MichelinSpider(scrapy.Spider):
     ]
 
     custom_settings = {
+        # Rythme de départ : la régulation adaptative (CrawlerDownloaderMiddleware)
+        # accélère ensuite tant que le site répond sans 429 / 503
         'DOWNLOAD_DELAY': 2,
         'CONCURRENT_REQUESTS_PER_DOMAIN': 1,
+        # Chaque page de listing est demandée depuis la précédente : la profondeur
+        # croît avec le nombre de pages, borné par la dernière page annoncée par
+        # la pagination du site et, s'il est donné, par l'argument max_pages
+        'DEPTH_LIMIT': 0,
         'ROBOTSTXT_OBEY': False,
         'USER_AGENT': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'FEEDS': {
-            'michelin_restaurants.json': {
-                'format': 'json',
-                'encoding': 'utf-8',
-                'indent': 4,
-                'overwrite': True
-            }
+            FULL_FEED: dict(FEED_OPTIONS, overwrite=True)
         }
     }
 
+    def __init__(self, k=10, prix_max=None, max_pages=None, concurrency=1, *args, **kwargs):
+        """Arguments (scrapy crawl michelin_spider -a k=10 -a prix_max=2 ...) :
+
+        k           : nombre de restaurants les moins chers gardés par capitale
+        prix_max    : niveau de prix maximal (nombre de €), pas de limite par défaut
+        max_pages   : nombre maximal de pages de listing lues par capitale
+        concurrency : pages de listing téléchargées en parallèle par capitale
+        """
+        super().__init__(*args, **kwargs)
+        self.k = int(k)
+        self.prix_max = int(prix_max) if prix_max not in (None, '') else None
+        self.max_pages = int(max_pages) if max_pages not in (None, '') else None
+        self.concurrency = int(concurrency)
+        for name in ('k', 'max_pages', 'concurrency'):
+            value = getattr(self, name)
+            if value is not None and value < 1:
+                raise ValueError(f"Argument {name} invalide : {value} (au moins 1)")
+        # État du parcours de chaque capitale (tas des k moins chers, pages en cours)
+        self.cities = {}
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # Les pages d'une capitale sont sur le même domaine : la concurrence par
+        # domaine doit suivre l'argument (réglages encore modifiables à ce stade)
+        crawler.settings.set('CONCURRENT_REQUESTS_PER_DOMAIN', spider.concurrency, priority='spider')
+        # Un crawl incrémental n'émet que les fiches modifiées : il ne doit pas
+        # écraser l'instantané complet (l'archive HTTP désactive l'incrémental)
+        settings = crawler.settings
+        if settings.getbool('INCREMENTAL_CRAWL_ENABLED') and not settings.get('HTTP_ARCHIVE_MODE'):
+            settings.set('FEEDS', {DELTA_FEED: dict(FEED_OPTIONS)}, priority='spider')
+        return spider
+
     def parse(self, response):
-        """Parse la page de listing des restaurants"""
+        """Parse la première page de listing d'une capitale"""
 
         capitale = self.get_capitale_from_url(response.url)
         self.logger.info(f"📍 Scraping des restaurants à {capitale}")
 
-        # Sélectionner tous les restaurants
-        restaurants = response.css('div.card__menu')
-        self.logger.info(f"📍 Trouvé {len(restaurants)} restaurants à {capitale}")
+        last_page = self.get_last_page(response)
+        if self.max_pages:
+            last_page = min(last_page, self.max_pages)
+        self.logger.info(f"📄 {last_page} page(s) de listing à {capitale}")
+
+        self.cities[capitale] = {
+            'heap': [],           # tas max (par prix) des k candidats les moins chers
+            'seen': 0,            # restaurants vus (ordre du listing, départage les égalités)
+            'base_url': response.url.split('?')[0].rstrip('/'),
+            'next_page': 2,
+            'last_page': last_page,
+            'in_flight': 0,
+        }
 
-        if not restaurants:
+        if not self.collect_candidates(response, capitale):
             self.logger.warning(f"⚠️ Aucun restaurant trouvé pour {capitale}")
-            return
 
-        restaurants_data = []
+        yield from self.schedule_next(capitale)
 
-        for resto in restaurants:
-            # Nom du restaurant
-            nom = resto.css('h3.card__menu-content--title a::text').get()
-            if not nom:
-                nom = resto.css('h3.card__menu-content--title::text').get()
+    def parse_listing_page(self, response):
+        """Parse une page de listing suivante (2, 3, ...)"""
+        capitale = response.meta['capitale']
+        self.cities[capitale]['in_flight'] -= 1
+        self.collect_candidates(response, capitale)
+        yield from self.schedule_next(capitale)
 
-            # URL de la page détaillée
-            url = resto.css('h3.card__menu-content--title a::attr(href)').get()
-            if url:
-                url = response.urljoin(url)
+    def listing_page_failed(self, failure):
+        """Une page de listing en échec ne doit pas bloquer les détails de la capitale"""
+        capitale = failure.request.meta['capitale']
+        self.logger.warning(f"⚠️ Page de listing en échec ({capitale}): {failure.request.url}")
+        self.cities[capitale]['in_flight'] -= 1
+        yield from self.schedule_next(capitale)
+
+    def collect_candidates(self, response, capitale):
+        """Ajoute les restaurants d'une page au tas des k moins chers ; retourne leur nombre"""
+        city = self.cities[capitale]
+        heap = city['heap']
+        count = 0
 
+        # Sélectionner tous les restaurants
+        for resto in response.css('div.card__menu'):
+            count += 1
             # Prix (symboles €)
             prix_text = resto.css('div.card__menu-footer--price::text').get()
             prix_niveau = self.extract_price_level(prix_text)
+            if self.prix_max is not None and prix_niveau > self.prix_max:
+                continue
+
+            # URL de la page détaillée
+            url = resto.css('h3.card__menu-content--title a::attr(href)').get()
+            if not url:
+                continue
 
-            restaurants_data.append({
+            # Nom du restaurant
+            nom = resto.css('h3.card__menu-content--title a::text').get()
+            if not nom:
+                nom = resto.css('h3.card__menu-content--title::text').get()
+
+            city['seen'] += 1
+            # Clé négative : heap[0] est le pire candidat gardé (plus cher, vu en dernier)
+            key = (-prix_niveau, -city['seen'])
+            if len(heap) >= self.k:
+                if key <= heap[0][:2]:
+                    continue
+                heapq.heappop(heap)
+            heapq.heappush(heap, (key[0], key[1], {
                 'nom': self.clean_text(nom),
                 'capitale': capitale,
                 'prix': self.clean_text(prix_text),
                 'prix_niveau': prix_niveau,
-                'url': url
-            })
-
-        # Trier par prix (du moins cher au plus cher)
-        restaurants_data.sort(key=lambda x: x['prix_niveau'])
-        self.logger.info(f"💰 {len(restaurants_data)} restaurants après tri par prix")
-
-        # Prendre les 10 restaurants les moins chers
-        top_10 = restaurants_data[:10]
+                'url': response.urljoin(url)
+            }))
+
+        self.logger.info(f"📍 {count} restaurants sur {response.url}")
+        return count
+
+    def is_saturated(self, capitale):
+        """Vrai si les k candidats gardés sont déjà au prix minimal (€) : inutile de lire la suite"""
+        heap = self.cities[capitale]['heap']
+        return len(heap) >= self.k and -heap[0][0] <= 1
+
+    def schedule_next(self, capitale):
+        """Garde `concurrency` pages en cours ; une fois toutes lues, demande les détails"""
+        city = self.cities[capitale]
+        while (city['in_flight'] < self.concurrency
+               and city['next_page'] <= city['last_page']
+               and not self.is_saturated(capitale)):
+            yield scrapy.Request(
+                url=f"{city['base_url']}/page/{city['next_page']}",
+                callback=self.parse_listing_page,
+                errback=self.listing_page_failed,
+                meta={'capitale': capitale}
+            )
+            city['in_flight'] += 1
+            city['next_page'] += 1
+
+        if city['in_flight'] == 0:
+            yield from self.request_details(capitale)
+
+    def request_details(self, capitale):
+        """Détails des k restaurants les moins chers, seuls à être téléchargés"""
+        city = self.cities.pop(capitale)
+        top_k = [entry[2] for entry in sorted(city['heap'], key=lambda e: (-e[0], -e[1]))]
+        self.logger.info(
+            f"💰 {capitale}: {len(top_k)} restaurants retenus parmi {city['seen']} "
+            f"({city['next_page'] - 1} page(s) lue(s))"
+        )
 
         # Scraper les détails de chaque restaurant
-        for resto in top_10:
-            if resto['url']:
-                yield scrapy.Request(
-                    url=resto['url'],
-                    callback=self.parse_detail,
-                    meta={'resto_base': resto}
-                )
+        for resto in top_k:
+            yield scrapy.Request(
+                url=resto['url'],
+                callback=self.parse_detail,
+                meta={'resto_base': resto}
+            )
+
+    def get_last_page(self, response):
+        """Numéro de la dernière page d'après les liens de pagination (1 s'il n'y en a pas)"""
+        pages = [1]
+        for href in response.css('ul.pagination a::attr(href)').getall():
+            match = re.search(r'/page/(\d+)', href)
+            if match:
+                pages.append(int(match.group(1)))
+        return max(pages)
 
     def parse_detail(self, response):
         """Parse la page détaillée d'un restaurant"""
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Géocodage hors ligne pour l'import : aucune requête réseau.
+
+- Capitales : table de coordonnées partagée avec le backend (centre-ville).
+- Restaurants : table locale adresse -> [lat, lon] (fichier JSON, optionnel,
+  chemin dans GEOCODING_TABLE). Sans entrée pour l'adresse, le restaurant n'a
+  pas de position : le centre de la capitale serait un faux point exact, qui
+  fausserait le tri par distance de /api/restaurants/near.
+"""
+
+import json
+import os
+
+
+# Coordonnées [lat, lon] des capitales (centre-ville) : table unique, lue aussi
+# par le backend (utils.py). Copiée dans /shared par les Dockerfile.
+CAPITAL_COORDINATES_FILE = os.getenv(
+    "CAPITAL_COORDINATES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared", "capital_coordinates.json")
+)
+with open(CAPITAL_COORDINATES_FILE, 'r', encoding='utf-8') as f:
+    CAPITAL_COORDINATES = json.load(f)
+
+# Préfixes ajoutés par le Routard au nom des capitales
+CAPITAL_PREFIXES = ["Guide de voyage et vacances à ", "Guide de voyage ", "Visiter ", "Vacances à "]
+
+GEOCODING_TABLE = os.getenv("GEOCODING_TABLE", os.path.join(os.path.dirname(__file__), "geocodage.json"))
+
+# Table chargée une seule fois par processus (les workers d'import la rechargent)
+_address_table = None
+
+
+def clean_capital_name(name):
+    """Nom de capitale sans préfixe de guide ni pays ("Visiter Nicosie, Chypre" -> "Nicosie")"""
+    clean = str(name or '')
+    for prefix in CAPITAL_PREFIXES:
+        clean = clean.replace(prefix, "")
+    return clean.split(',')[0].strip()
+
+
+def normalize_address(adresse):
+    return ' '.join(str(adresse).replace(',', ' ').split()).casefold()
+
+
+def address_table():
+    """Table adresse normalisée -> [lat, lon], vide si le fichier n'existe pas"""
+    global _address_table
+    if _address_table is None:
+        _address_table = {}
+        if os.path.exists(GEOCODING_TABLE):
+            with open(GEOCODING_TABLE, 'r', encoding='utf-8') as f:
+                _address_table = {normalize_address(k): v for k, v in json.load(f).items()}
+        else:
+            print(f"⚠️  Table de géocodage introuvable ({GEOCODING_TABLE}) : "
+                  f"les restaurants sont importés sans position")
+    return _address_table
+
+
+def geo_point(lat, lon):
+    """Point GeoJSON (attention : longitude en premier), format des index 2dsphere"""
+    return {'type': 'Point', 'coordinates': [float(lon), float(lat)]}
+
+
+def capital_location(capitale):
+    """Point GeoJSON du centre d'une capitale, ou None si elle est inconnue"""
+    coords = CAPITAL_COORDINATES.get(clean_capital_name(capitale))
+    return geo_point(*coords) if coords else None
+
+
+def restaurant_location(adresse):
+    """(point GeoJSON, précision 'adresse') d'un restaurant, ou (None, None)
+
+    Seule une adresse présente dans la table locale donne une position.
+    """
+    table = address_table()
+    if adresse:
+        coords = table.get(normalize_address(adresse))
+        if coords:
+            return geo_point(*coords), 'adresse'
+    return None, None
@@ -3,30 +3,174 @@
 """
 Script pour importer vos données JSON scrappées dans MongoDB
 Usage: python import_data.py restaurant restaurants.json
-       python import_data.py capitale capitales.json
+       python import_data.py capitale capitales.json [--batch-size 1000] [--progress]
+       python import_data.py capitale . [--workers 4] [--writers 4]
 """
 
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from itertools import repeat
+import argparse
+import glob
+import hashlib
 import json
+import multiprocessing
 import os
 import sys
+import threading
+
+from gazetteer import capital_location, clean_capital_name, restaurant_location
+from json_stream import iter_json_items
+
+
+# Nombre d'opérations envoyées par appel à bulk_write
+DEFAULT_BATCH_SIZE = 1000
+
+# Nombre de threads qui envoient les lots en parallèle (import multi-fichiers)
+DEFAULT_WRITERS = 4
+
+# Collection cible selon le type passé en ligne de commande
+COLLECTIONS = {'capitale': 'capitales', 'restaurant': 'restaurants'}
+
+# Fichiers retenus quand on passe un dossier, selon le type importé
+DIRECTORY_PREFIXES = {
+    'capitale': ('capitals_',),
+    'restaurant': ('michelin_', 'restaurants'),
+}
+FEED_EXTENSIONS = ('.json', '.jsonl', '.json.gz', '.jsonl.gz')
+
+# Suppressions (--prune), lues par la synchronisation Elasticsearch du backend.
+# Doit rester identique à TOMBSTONE_COLLECTION dans database.py
+TOMBSTONE_COLLECTION = 'deletions'
+
+# Position : retirée de la base quand l'import n'en fournit plus (pas de faux point)
+GEO_FIELDS = ('location', 'geo_precision')
+
+# Champs techniques exclus de l'empreinte de contenu
+VOLATILE_FIELDS = ('date_scraping', 'last_updated', 'content_hash')
+
+
+def content_fingerprint(doc):
+    """Empreinte stable (SHA-1) des champs métier d'un document nettoyé"""
+    business = {k: v for k, v in doc.items() if k not in VOLATILE_FIELDS}
+    payload = json.dumps(business, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def city_key(name):
+    """Clé de recherche d'une ville : insensible à la casse et aux espaces superflus
+
+    Doit rester identique à utils.city_key côté backend.
+    """
+    return ' '.join(str(name).split()).casefold()
+
+
+def scraping_date(doc):
+    """Date de scraping d'un document, pour départager les doublons entre fichiers"""
+    value = doc.get('date_scraping')
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, "%d/%m/%Y")
+        except ValueError:
+            pass
+        try:
+            return datetime.fromisoformat(value).replace(tzinfo=None)
+        except ValueError:
+            pass
+    return datetime.min
+
+
+def resolve_sources(sources, data_type):
+    """Liste les fichiers à importer à partir de fichiers, dossiers ou motifs glob"""
+    files = []
+    for source in sources:
+        if os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.startswith(DIRECTORY_PREFIXES[data_type]) and name.endswith(FEED_EXTENSIONS):
+                    files.append(os.path.join(source, name))
+        elif any(c in source for c in '*?['):
+            files.extend(sorted(glob.glob(source)))
+        else:
+            files.append(source)
+    # Sans doublons, en gardant l'ordre (utile pour départager les égalités)
+    return list(dict.fromkeys(files))
+
+
+def parse_feed_file(json_file, data_type):
+    """Lit et nettoie un fichier (exécuté dans un processus séparé)
+
+    Retourne (fichier, {clé: document nettoyé}, nombre d'erreurs, message d'erreur).
+    Les doublons internes au fichier sont déjà fusionnés par date de scraping.
+    """
+    collection_name = COLLECTIONS[data_type]
+    key_fields = MongoDBImporter.KEY_FIELDS[collection_name]
+    if data_type == 'capitale':
+        clean = MongoDBImporter._clean_capitale
+    else:
+        clean = MongoDBImporter._clean_restaurant
+    
+    items = {}
+    errors = 0
+    try:
+        for item in iter_json_items(json_file):
+            try:
+                clean_item = clean(item)
+            except Exception:
+                errors += 1
+                continue
+            if not all(clean_item.get(field) for field in key_fields):
+                errors += 1
+                continue
+            merge_latest(items, tuple(clean_item[field] for field in key_fields), clean_item)
+    except (OSError, json.JSONDecodeError) as e:
+        return json_file, items, errors + 1, str(e)
+    return json_file, items, errors, None
+
+
+def merge_latest(items, key, clean_item):
+    """Garde la version la plus récemment scrapée (le dernier arrivé gagne en cas d'égalité)"""
+    current = items.get(key)
+    if current is None or scraping_date(clean_item) >= scraping_date(current):
+        items[key] = clean_item
 
 
 class MongoDBImporter:
     """Classe pour importer des données JSON dans MongoDB"""
     
-    def __init__(self, mongo_uri='mongodb://mongodb_guide:27017/', database='guide_voyage'):
+    # Champs qui identifient un document dans chaque collection
+    KEY_FIELDS = {
+        'capitales': ('capitale',),
+        'restaurants': ('nom', 'capitale'),
+    }
+    
+    def __init__(self, mongo_uri='mongodb://mongodb_guide:27017/', database='guide_voyage',
+                 batch_size=DEFAULT_BATCH_SIZE, progress=False):
         print(f"🔗 Connexion à MongoDB...")
         self.client = MongoClient(mongo_uri)
         self.db = self.client[database]
         self.capitales = self.db['capitales']
         self.restaurants = self.db['restaurants']
+        self.batch_size = max(1, int(batch_size))
+        self.progress = progress
+        # Opérations UpdateOne en attente d'envoi, par collection
+        self._pending = {'capitales': [], 'restaurants': []}
+        # Empreintes connues en base (clé -> content_hash), chargées au début de l'import
+        self._known_hashes = {'capitales': {}, 'restaurants': {}}
+        # Clés lues dans les fichiers importés (--prune supprime les autres)
+        self._seen_keys = {'capitales': set(), 'restaurants': set()}
+        # Les compteurs sont partagés par les threads d'écriture
+        self._stats_lock = threading.Lock()
         self.stats = {
             'capitales_inserted': 0,
             'capitales_updated': 0,
+            'capitales_unchanged': 0,
             'restaurants_inserted': 0,
             'restaurants_updated': 0,
+            'restaurants_unchanged': 0,
+            'capitales_deleted': 0,
+            'restaurants_deleted': 0,
             'errors': 0
         }
         self._create_indexes()
@@ -37,13 +181,24 @@ class MongoDBImporter:
         # Index capitales
         self.capitales.create_index('capitale', unique=True)
         self.capitales.create_index('date_scraping')
+        # Résolution groupée des villes ($in de /api/cities/bundle)
+        self.capitales.create_index('capitale_key')
+        self.capitales.create_index([('location', '2dsphere')])
         
         # Index restaurants
         self.restaurants.create_index([('nom', 1), ('capitale', 1)], unique=True)
         self.restaurants.create_index('capitale')
+        # Recherche exacte et indexée par ville (/api/restaurants/<city_name>),
+        # avec _id pour la pagination par curseur
+        self.restaurants.create_index([('capitale_key', 1), ('_id', 1)])
         self.restaurants.create_index('type_cuisine')
         self.restaurants.create_index('prix_niveau')
         self.restaurants.create_index('date_scraping')
+        # Requêtes de proximité ($geoNear, /api/restaurants/near)
+        self.restaurants.create_index([('location', '2dsphere')])
+        
+        # Tombstones lues par date de suppression (synchronisation Elasticsearch)
+        self.db[TOMBSTONE_COLLECTION].create_index([('collection', 1), ('deleted_at', 1)])
         
         print("✅ Index créés\n")
     
@@ -52,18 +207,15 @@ class MongoDBImporter:
         print(f"📍 Import des capitales depuis {json_file}...")
         
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Si c'est un seul objet, le met dans une liste
-            if isinstance(data, dict):
-                data = [data]
-            
-            for item in data:
+            self._load_hashes('capitales')
+            # Lecture en flux : tableau JSON, JSON Lines ou objet unique (gzip accepté)
+            for item in iter_json_items(json_file):
                 self._insert_capitale(item)
+            self._flush('capitales')
             
             print(f"\n✅ Import terminé: {self.stats['capitales_inserted']} insérées, "
-                  f"{self.stats['capitales_updated']} mises à jour")
+                  f"{self.stats['capitales_updated']} mises à jour, "
+                  f"{self.stats['capitales_unchanged']} inchangées")
             
         except FileNotFoundError:
             print(f"❌ Fichier non trouvé: {json_file}")
@@ -73,24 +225,24 @@ class MongoDBImporter:
             print(f"💡 Vérifiez que votre fichier JSON est valide")
         except Exception as e:
             print(f"❌ Erreur: {e}")
+        finally:
+            # Envoie les éléments lus avant une éventuelle erreur
+            self._flush('capitales')
     
     def import_restaurants_from_json(self, json_file):
         """Importe les restaurants depuis un fichier JSON"""
         print(f"🍽️  Import des restaurants depuis {json_file}...")
         
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Si c'est un seul objet, le met dans une liste
-            if isinstance(data, dict):
-                data = [data]
-            
-            for item in data:
+            self._load_hashes('restaurants')
+            # Lecture en flux : tableau JSON, JSON Lines ou objet unique (gzip accepté)
+            for item in iter_json_items(json_file):
                 self._insert_restaurant(item)
+            self._flush('restaurants')
             
             print(f"\n✅ Import terminé: {self.stats['restaurants_inserted']} insérés, "
-                  f"{self.stats['restaurants_updated']} mis à jour")
+                  f"{self.stats['restaurants_updated']} mis à jour, "
+                  f"{self.stats['restaurants_unchanged']} inchangés")
             
         except FileNotFoundError:
             print(f"❌ Fichier non trouvé: {json_file}")
@@ -100,9 +252,58 @@ class MongoDBImporter:
             print(f"💡 Vérifiez que votre fichier JSON est valide")
         except Exception as e:
             print(f"❌ Erreur: {e}")
+        finally:
+            # Envoie les éléments lus avant une éventuelle erreur
+            self._flush('restaurants')
+    
+    def import_files(self, data_type, json_files, workers=None, writers=DEFAULT_WRITERS):
+        """Importe plusieurs fichiers : lecture en parallèle, fusion, puis écriture concurrente"""
+        collection_name = COLLECTIONS[data_type]
+        workers = workers or os.cpu_count() or 1
+        print(f"📚 Import de {len(json_files)} fichiers ({collection_name}) "
+              f"avec {workers} processus de lecture et {writers} threads d'écriture...")
+        
+        self._load_hashes(collection_name)
+        
+        # 1. Lecture et nettoyage en parallèle, fusion "dernier scraping gagnant"
+        merged = {}
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            # map() rend les résultats dans l'ordre des fichiers : les égalités vont au plus récent
+            for json_file, items, errors, error in pool.map(parse_feed_file, json_files, repeat(data_type)):
+                if error:
+                    print(f"  ❌ {json_file}: {error}")
+                elif self.progress:
+                    print(f"  📄 {json_file}: {len(items)} éléments")
+                self.stats['errors'] += errors
+                for key, clean_item in items.items():
+                    merge_latest(merged, key, clean_item)
+        
+        print(f"🔀 {len(merged)} éléments uniques après fusion")
+        
+        # 2. Écriture par lots, répartis sur plusieurs threads
+        with ThreadPoolExecutor(max_workers=max(1, writers)) as pool:
+            futures = []
+            batch = []
+            for clean_item in merged.values():
+                operation = self._build_upsert(collection_name, clean_item)
+                if operation is None:
+                    continue
+                batch.append(operation)
+                if len(batch) >= self.batch_size:
+                    futures.append(pool.submit(self._write_batch, collection_name, batch))
+                    batch = []
+            if batch:
+                futures.append(pool.submit(self._write_batch, collection_name, batch))
+            for future in futures:
+                future.result()
+        
+        print(f"\n✅ Import terminé: {self.stats[f'{collection_name}_inserted']} insérés, "
+              f"{self.stats[f'{collection_name}_updated']} mis à jour, "
+              f"{self.stats[f'{collection_name}_unchanged']} inchangés")
     
     def _insert_capitale(self, item):
-        """Insère ou met à jour une capitale"""
+        """Ajoute l'upsert d'une capitale au lot en cours"""
         try:
             # Nettoyage
             clean_item = self._clean_capitale(item)
@@ -112,28 +313,14 @@ class MongoDBImporter:
                 self.stats['errors'] += 1
                 return
             
-            # Upsert (insert ou update)
-            result = self.capitales.update_one(
-                {'capitale': clean_item['capitale']},
-                {'$set': clean_item},
-                upsert=True
-            )
-            
-            if result.upserted_id:
-                self.stats['capitales_inserted'] += 1
-                print(f"  ✅ {clean_item['capitale']}")
-            elif result.modified_count > 0:
-                self.stats['capitales_updated'] += 1
-                print(f"  🔄 {clean_item['capitale']} (mise à jour)")
-            else:
-                print(f"  ℹ️  {clean_item['capitale']} (déjà à jour)")
+            self._upsert_if_changed('capitales', clean_item)
             
         except Exception as e:
             self.stats['errors'] += 1
             print(f"  ❌ Erreur: {e}")
     
     def _insert_restaurant(self, item):
-        """Insère ou met à jour un restaurant"""
+        """Ajoute l'upsert d'un restaurant au lot en cours"""
         try:
             # Nettoyage
             clean_item = self._clean_restaurant(item)
@@ -143,32 +330,97 @@ class MongoDBImporter:
                 self.stats['errors'] += 1
                 return
             
-            # Upsert (insert ou update)
-            result = self.restaurants.update_one(
-                {'nom': clean_item['nom'], 'capitale': clean_item['capitale']},
-                {'$set': clean_item},
-                upsert=True
-            )
-            
-            if result.upserted_id:
-                self.stats['restaurants_inserted'] += 1
-                print(f"  ✅ {clean_item['nom']} ({clean_item['capitale']})")
-            elif result.modified_count > 0:
-                self.stats['restaurants_updated'] += 1
-                print(f"  🔄 {clean_item['nom']} ({clean_item['capitale']}) (mise à jour)")
-            else:
-                print(f"  ℹ️  {clean_item['nom']} ({clean_item['capitale']}) (déjà à jour)")
+            self._upsert_if_changed('restaurants', clean_item)
             
         except Exception as e:
             self.stats['errors'] += 1
             print(f"  ❌ Erreur: {e}")
     
-    def _clean_capitale(self, item):
+    def _load_hashes(self, collection_name):
+        """Charge en une requête projetée les empreintes déjà en base"""
+        key_fields = self.KEY_FIELDS[collection_name]
+        projection = {field: 1 for field in key_fields}
+        projection.update({'content_hash': 1, '_id': 0})
+        
+        known = {}
+        for doc in self.db[collection_name].find({'content_hash': {'$exists': True}}, projection):
+            known[tuple(doc.get(field) for field in key_fields)] = doc['content_hash']
+        self._known_hashes[collection_name] = known
+    
+    def _upsert_if_changed(self, collection_name, clean_item):
+        """Met l'upsert en attente, sauf si le contenu est identique à celui en base"""
+        operation = self._build_upsert(collection_name, clean_item)
+        if operation is not None:
+            self._queue(collection_name, operation)
+    
+    def _build_upsert(self, collection_name, clean_item):
+        """Construit l'UpdateOne d'un document, ou None si son contenu est inchangé"""
+        key_fields = self.KEY_FIELDS[collection_name]
+        key = tuple(clean_item[field] for field in key_fields)
+        known = self._known_hashes[collection_name]
+        self._seen_keys[collection_name].add(key)
+        
+        if known.get(key) == clean_item['content_hash']:
+            # Contenu inchangé : aucune écriture, last_updated reste tel quel
+            self.stats[f'{collection_name}_unchanged'] += 1
+            return None
+        known[key] = clean_item['content_hash']
+        
+        # Upsert (insert ou update), envoyé par lot
+        update = {'$set': {**clean_item, 'last_updated': datetime.now()}}
+        missing = [field for field in GEO_FIELDS if field not in clean_item]
+        if missing:
+            update['$unset'] = {field: '' for field in missing}
+        return UpdateOne({field: clean_item[field] for field in key_fields}, update, upsert=True)
+    
+    def _queue(self, collection_name, operation):
+        """Met une opération en attente et envoie le lot quand il est plein"""
+        pending = self._pending[collection_name]
+        pending.append(operation)
+        if len(pending) >= self.batch_size:
+            self._flush(collection_name)
+    
+    def _flush(self, collection_name):
+        """Envoie le lot en attente avec un bulk_write non ordonné"""
+        operations = self._pending[collection_name]
+        if not operations:
+            return
+        self._pending[collection_name] = []
+        self._write_batch(collection_name, operations)
+    
+    def _write_batch(self, collection_name, operations):
+        """Envoie un lot d'opérations et met à jour les compteurs"""
+        collection = self.db[collection_name]
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            inserted = result.upserted_count
+            updated = result.modified_count
+            errors = 0
+        except BulkWriteError as e:
+            # En mode non ordonné, les autres opérations du lot sont quand même appliquées
+            details = e.details
+            inserted = details.get('nUpserted', 0)
+            updated = details.get('nModified', 0)
+            errors = len(details.get('writeErrors', []))
+        
+        with self._stats_lock:
+            self.stats[f'{collection_name}_inserted'] += inserted
+            self.stats[f'{collection_name}_updated'] += updated
+            self.stats['errors'] += errors
+            
+            if self.progress:
+                print(f"  📦 {collection_name}: lot de {len(operations)} envoyé "
+                      f"({inserted} insérés, {updated} mis à jour, {errors} erreurs)")
+    
+    @staticmethod
+    def _clean_capitale(item):
         """Nettoie les données d'une capitale"""
         clean = {}
         
         if 'capitale' in item:
             clean['capitale'] = str(item['capitale']).strip()
+            # Même clé que les restaurants ("Visiter Nicosie, Chypre" -> "nicosie")
+            clean['capitale_key'] = city_key(clean_capital_name(clean['capitale']))
         
         if 'description' in item and item['description']:
             clean['description'] = str(item['description']).strip()
@@ -182,15 +434,20 @@ class MongoDBImporter:
         if 'url' in item and item['url']:
             clean['url'] = str(item['url']).strip()
         
+        # Centre-ville en GeoJSON (index 2dsphere)
+        if clean.get('capitale'):
+            clean['location'] = capital_location(clean['capitale'])
+        
         clean['date_scraping'] = item.get('date_scraping', datetime.now().strftime("%d/%m/%Y"))
-        clean['last_updated'] = datetime.now()
         
         # Supprime les valeurs None ou vides
         clean = {k: v for k, v in clean.items() if v not in [None, '', 'null']}
+        clean['content_hash'] = content_fingerprint(clean)
         
         return clean
     
-    def _clean_restaurant(self, item):
+    @staticmethod
+    def _clean_restaurant(item):
         """Nettoie les données d'un restaurant"""
         clean = {}
         
@@ -199,6 +456,7 @@ class MongoDBImporter:
         
         if 'capitale' in item:
             clean['capitale'] = str(item['capitale']).strip()
+            clean['capitale_key'] = city_key(clean['capitale'])
         
         if 'adresse' in item and item['adresse']:
             clean['adresse'] = str(item['adresse']).strip()
@@ -233,14 +491,66 @@ class MongoDBImporter:
         if 'url' in item and item['url']:
             clean['url'] = str(item['url']).strip()
         
+        # Position : adresse géocodée localement, sinon aucune (pas de faux point)
+        location, precision = restaurant_location(clean.get('adresse'))
+        if location:
+            clean['location'] = location
+            clean['geo_precision'] = precision
+        
         clean['date_scraping'] = item.get('date_scraping', datetime.now().isoformat())
-        clean['last_updated'] = datetime.now()
         
         # Supprime les valeurs None ou vides
         clean = {k: v for k, v in clean.items() if v not in [None, '', 'null', []]}
+        clean['content_hash'] = content_fingerprint(clean)
         
         return clean
     
+    def prune(self, data_type):
+        """Supprime les documents absents des fichiers importés (instantané complet)
+
+        Chaque suppression laisse une tombstone {collection, key, deleted_at} :
+        la synchronisation Elasticsearch ne supprime que ces documents-là.
+        """
+        collection_name = COLLECTIONS[data_type]
+        seen = self._seen_keys[collection_name]
+        if not seen or self.stats['errors']:
+            print(f"⚠️  --prune ignoré : import vide ou avec erreurs, rien n'est supprimé")
+            return
+        
+        key_fields = self.KEY_FIELDS[collection_name]
+        projection = {field: 1 for field in key_fields}
+        collection = self.db[collection_name]
+        stale = [
+            doc for doc in collection.find({}, projection)
+            if tuple(doc.get(field) for field in key_fields) not in seen
+        ]
+        for start in range(0, len(stale), self.batch_size):
+            batch = stale[start:start + self.batch_size]
+            now = datetime.now()
+            # Tombstones d'abord : une suppression interrompue sera tout de même propagée
+            self.db[TOMBSTONE_COLLECTION].insert_many([
+                {'collection': collection_name,
+                 'key': {field: doc.get(field) for field in key_fields},
+                 'deleted_at': now}
+                for doc in batch
+            ])
+            result = collection.delete_many({'_id': {'$in': [doc['_id'] for doc in batch]}})
+            self.stats[f'{collection_name}_deleted'] += result.deleted_count
+        
+        print(f"🗑️  {self.stats[f'{collection_name}_deleted']} {collection_name} absents des fichiers supprimés")
+    
+    def bump_data_version(self):
+        """Incrémente la version des données si l'import a écrit quelque chose
+
+        L'API s'appuie sur cette version pour invalider ses réponses en cache.
+        """
+        written = sum(self.stats[f'{c}_{k}'] for c in ('capitales', 'restaurants')
+                      for k in ('inserted', 'updated', 'deleted'))
+        if written:
+            self.db['metadata'].update_one(
+                {'_id': 'data_version'}, {'$inc': {'version': 1}}, upsert=True
+            )
+    
     def display_stats(self):
         """Affiche les statistiques finales"""
         print("\n" + "=" * 60)
@@ -249,9 +559,13 @@ class MongoDBImporter:
         print(f"Capitales:")
         print(f"  - Insérées: {self.stats['capitales_inserted']}")
         print(f"  - Mises à jour: {self.stats['capitales_updated']}")
+        print(f"  - Inchangées: {self.stats['capitales_unchanged']}")
+        print(f"  - Supprimées: {self.stats['capitales_deleted']}")
         print(f"\nRestaurants:")
         print(f"  - Insérés: {self.stats['restaurants_inserted']}")
         print(f"  - Mis à jour: {self.stats['restaurants_updated']}")
+        print(f"  - Inchangés: {self.stats['restaurants_unchanged']}")
+        print(f"  - Supprimés: {self.stats['restaurants_deleted']}")
         print(f"\nErreurs: {self.stats['errors']}")
         print("=" * 60)
     
@@ -271,45 +585,77 @@ def main():
     if len(sys.argv) < 3:
         print("📖 Comment utiliser ce script:")
         print()
-        print("  python import_data.py <type> <fichier.json>")
+        print("  python import_data.py <type> <fichier.json|dossier|motif> [...] [options]")
         print()
         print("  <type> peut être:")
         print("    - capitale   (pour importer des capitales)")
         print("    - restaurant (pour importer des restaurants)")
         print()
         print("  <fichier.json> est le chemin vers votre fichier")
+        print("  (tableau JSON, JSON Lines ou objet unique, éventuellement compressé .gz)")
+        print("  Un dossier ou un motif glob importe plusieurs instantanés en parallèle ;")
+        print("  dans un dossier, seuls capitals_* (capitale) ou michelin_*/restaurants* (restaurant)")
+        print("  sont retenus. Les doublons sont fusionnés : le scraping le plus récent gagne.")
+        print()
+        print("  Options:")
+        print(f"    --batch-size N  nombre d'upserts par bulk_write (défaut: {DEFAULT_BATCH_SIZE})")
+        print("    --progress      affiche un résumé après chaque lot envoyé")
+        print("    --workers N     processus de lecture (défaut: nombre de coeurs)")
+        print(f"    --writers N     threads d'écriture (défaut: {DEFAULT_WRITERS})")
+        print("    --prune         supprime de la base les documents absents des fichiers")
+        print("                    (instantané complet uniquement, pas un fichier delta)")
         print()
         print("💡 Exemples:")
         print("  python import_data.py capitale capitales.json")
         print("  python import_data.py restaurant restaurants.json")
         print("  python import_data.py restaurant C:/Users/vous/data/restos.json")
+        print("  python import_data.py capitale .")
+        print("  python import_data.py capitale 'capitals_*.json'")
         print()
         sys.exit(1)
     
-    data_type = sys.argv[1].lower()
-    json_file = sys.argv[2]
+    parser = argparse.ArgumentParser()
+    parser.add_argument('data_type')
+    parser.add_argument('sources', nargs='+')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--progress', action='store_true')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--writers', type=int, default=DEFAULT_WRITERS)
+    parser.add_argument('--prune', action='store_true')
+    args = parser.parse_args()
+    
+    data_type = args.data_type.lower()
     
     # Vérification du type
     if data_type not in ['capitale', 'restaurant']:
         print("❌ Type invalide. Utilisez 'capitale' ou 'restaurant'")
         sys.exit(1)
     
-    # Vérification du fichier
-    if not os.path.exists(json_file):
-        print(f"❌ Fichier non trouvé: {json_file}")
+    json_files = resolve_sources(args.sources, data_type)
+    
+    # Vérification des fichiers
+    missing = [f for f in json_files if not os.path.exists(f)]
+    if not json_files or missing:
+        print(f"❌ Fichier non trouvé: {', '.join(missing) or ' '.join(args.sources)}")
         print(f"💡 Dossier actuel: {os.getcwd()}")
         print(f"💡 Fichiers disponibles: {os.listdir('.')}")
         sys.exit(1)
     
     # Import
     try:
-        importer = MongoDBImporter()
+        importer = MongoDBImporter(batch_size=args.batch_size, progress=args.progress)
         
-        if data_type == 'capitale':
-            importer.import_capitales_from_json(json_file)
+        if len(json_files) > 1:
+            importer.import_files(data_type, json_files, workers=args.workers, writers=args.writers)
+        elif data_type == 'capitale':
+            importer.import_capitales_from_json(json_files[0])
         else:
-            importer.import_restaurants_from_json(json_file)
+            importer.import_restaurants_from_json(json_files[0])
+        
+        if args.prune:
+            importer.prune(data_type)
         
+        importer.bump_data_version()
         importer.display_stats()
         importer.close()
         
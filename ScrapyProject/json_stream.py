@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Lecture en flux des fichiers JSON produits par Scrapy.
+
+Formats acceptés (compressés en gzip ou non) :
+  - un tableau JSON  : [ {...}, {...} ]   (FEEDS, RoutardPipeline, michelin_spider)
+  - du JSON Lines    : un objet par ligne
+  - un objet unique  : {...}
+
+Les objets sont produits un par un : la mémoire utilisée dépend de la taille
+du plus gros objet, pas de la taille du fichier.
+"""
+
+import gzip
+import io
+import json
+
+
+# Taille des blocs lus dans le fichier (en caractères)
+CHUNK_SIZE = 64 * 1024
+
+GZIP_MAGIC = b'\x1f\x8b'
+WHITESPACE = ' \t\n\r'
+
+
+def open_json_file(json_file):
+    """Ouvre un fichier JSON en texte, en le décompressant si c'est du gzip"""
+    with open(json_file, 'rb') as f:
+        magic = f.read(2)
+    if magic == GZIP_MAGIC:
+        return io.TextIOWrapper(gzip.open(json_file, 'rb'), encoding='utf-8')
+    return open(json_file, 'r', encoding='utf-8')
+
+
+def iter_json_items(json_file, chunk_size=CHUNK_SIZE):
+    """Génère les objets d'un fichier JSON, JSON Lines ou gzip, un par un"""
+    with open_json_file(json_file) as f:
+        reader = _StreamReader(f, chunk_size)
+        first = reader.peek()
+
+        if first is None:
+            return
+
+        if first == '[':
+            # Tableau JSON : on consomme les éléments entre les virgules
+            reader.advance(1)
+            if reader.peek() == ']':
+                reader.advance(1)
+            else:
+                while True:
+                    yield reader.decode()
+                    sep = reader.peek()
+                    if sep == ',':
+                        reader.advance(1)
+                    elif sep == ']':
+                        reader.advance(1)
+                        break
+                    else:
+                        raise reader.error("',' ou ']' attendu")
+            if reader.peek() is not None:
+                raise reader.error("données après la fin du tableau")
+        else:
+            # Objet unique ou JSON Lines : une suite de valeurs JSON
+            while reader.peek() is not None:
+                yield reader.decode()
+
+
+class _StreamReader:
+    """Tampon de lecture qui décode les valeurs JSON au fil de l'eau"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Lit un bloc de plus ; retourne False en fin de fichier"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # On oublie la partie déjà décodée pour garder un tampon borné
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Retourne le prochain caractère significatif (None en fin de fichier)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return None
+
+    def advance(self, n):
+        self.pos += n
+
+    def decode(self):
+        """Décode la prochaine valeur JSON, en lisant plus de données si besoin"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Une valeur qui touche la fin du tampon (ex: un nombre) peut être tronquée
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def error(self, message):
+        return json.JSONDecodeError(message, self.buffer, self.pos)
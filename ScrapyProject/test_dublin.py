@@ -1,7 +1,8 @@
 """Test fonctionnel pour Dublin (Version 2025)"""
 import scrapy
 from scrapy.crawler import CrawlerProcess
-import re
+
+from crawler.nextdata import CapitalGuide, next_payload
 
 class TestDublinSpider(scrapy.Spider):
     name = 'test_dublin'
@@ -18,35 +19,26 @@ class TestDublinSpider(scrapy.Spider):
         print("🎯 TEST EXTRACTION DATA DUBLIN (V2025)")
         print("="*80)
         
-        # 1. Extraction du script Next.js (Source réelle des données)
-        scripts = response.xpath('//script[contains(text(), "resume")]/text()').getall()
-        full_data_text = "".join(scripts)
-        
-        # 2. Localisation du champ "resume" qui contient le HTML des infos pratiques
-        resume_match = re.search(r'"resume":"(.*?)"', full_data_text)
-        
-        if resume_match:
-            # Décodage de l'unicode (\u003cp\u003e -> <p>)
-            raw_html = resume_match.group(1).encode().decode('unicode-escape')
-            # Nettoyage des balises HTML
-            clean_text = re.sub(r'<[^>]+>', ' ', raw_html)
-            
-            print(f"✅ Bloc de données trouvé ({len(clean_text)} caractères)")
+        # 1. Données Next.js (source réelle des données), décodées par le parseur JSON
+        payload = next_payload(response)
+        guide = CapitalGuide(payload)
 
-            # Extraction par patterns
-            patterns = {
-                "Meilleure saison": r'Meilleure saison\s*:\s*([^.]+)',
-                "Décalage horaire": r'Décalage horaire\s*:\s*([^.]+)',
-                "Durée de vol": r'Durée de vol direct[^:]*:\s*([^.]+)',
-                "Papiers": r'Papiers\s*:\s*([^.]+)'
-            }
+        # 2. Champ "resume" qui contient le HTML des infos pratiques
+        if guide.resume:
+            print(f"✅ Bloc de données trouvé ({len(guide.resume)} caractères)")
 
-            for label, pattern in patterns.items():
-                match = re.search(pattern, clean_text, re.IGNORECASE)
-                val = match.group(1).strip() if match else "❌ Non trouvé"
-                print(f"👉 {label}: {val}")
+            fields = {
+                "Meilleure saison": guide.best_season,
+                "Décalage horaire": guide.time_difference,
+                "Durée de vol": guide.flight_time,
+                "Papiers": guide.papers,
+            }
+            for label, val in fields.items():
+                print(f"👉 {label}: {val or '❌ Non trouvé'}")
+        elif payload is None:
+            print("❌ Erreur : Impossible de trouver les données Next.js de la page.")
         else:
-            print("❌ Erreur : Impossible de trouver le bloc 'resume' dans les scripts.")
+            print("❌ Erreur : Impossible de trouver le bloc 'resume' dans les données.")
 
         # 3. Test de la description meta
         meta_desc = response.xpath('//meta[@name="description"]/@content').get()
@@ -0,0 +1,83 @@
+"""Crawl incrémental : les deux middlewares partagent la même base d'empreintes
+
+Lancement (depuis ScrapyProject/) : python -m pytest tests
+"""
+
+import pytest
+import scrapy
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from crawler.fingerprints import PageFingerprintStore
+from crawler.middlewares import IncrementalCommitMiddleware, IncrementalCrawlMiddleware
+
+
+class DetailSpider(scrapy.Spider):
+    name = 'detail'
+    incremental_callbacks = ('parse_detail',)
+
+    def parse_detail(self, response):
+        yield {'url': response.url}
+
+
+def crawl_page(downloader_mw, spider_mw, spider, url, body):
+    """Une page à travers les deux middlewares, comme pendant un crawl"""
+    request = Request(url, callback=spider.parse_detail)
+    downloader_mw.process_request(request, spider)
+    response = HtmlResponse(url, body=body, request=request)
+    response = downloader_mw.process_response(request, response, spider)
+    return list(spider_mw.process_spider_output(response, spider.parse_detail(response), spider))
+
+
+@pytest.fixture
+def crawler(tmp_path):
+    crawler = get_crawler(DetailSpider, {
+        'INCREMENTAL_CRAWL_ENABLED': True,
+        'INCREMENTAL_CRAWL_DB': str(tmp_path / 'pages.sqlite'),
+    })
+    crawler.spider = DetailSpider()
+    return crawler
+
+
+def test_changed_page_fingerprint_is_saved(crawler, tmp_path):
+    spider = crawler.spider
+    downloader_mw = IncrementalCrawlMiddleware.from_crawler(crawler)
+    spider_mw = IncrementalCommitMiddleware.from_crawler(crawler)
+    assert downloader_mw.store is spider_mw.store
+
+    url = 'http://example.com/fiche'
+    assert crawl_page(downloader_mw, spider_mw, spider, url, b'<p>v1</p>')
+    # Une autre page inchangée écrit aussi dans la base avant le commit du callback
+    other = 'http://example.com/autre'
+    crawl_page(downloader_mw, spider_mw, spider, other, b'<p>autre</p>')
+    with pytest.raises(IgnoreRequest):
+        crawl_page(downloader_mw, spider_mw, spider, other, b'<p>autre</p>')
+
+    # Page modifiée : la nouvelle empreinte est enregistrée...
+    assert crawl_page(downloader_mw, spider_mw, spider, url, b'<p>v2</p>')
+    crawler.signals.send_catch_log(scrapy.signals.spider_closed, spider=spider, reason='finished')
+
+    store = PageFingerprintStore(str(tmp_path / 'pages.sqlite'))
+    assert store.get(url)['body_hash'] == PageFingerprintStore.body_hash(b'<p>v2</p>')
+    store.close()
+    assert crawler.stats.get_value('incremental/changed') == 1
+    assert crawler.stats.get_value('incremental/unchanged_hash') == 1
+
+
+def test_failed_callback_keeps_previous_fingerprint(crawler, tmp_path):
+    spider = crawler.spider
+    downloader_mw = IncrementalCrawlMiddleware.from_crawler(crawler)
+    spider_mw = IncrementalCommitMiddleware.from_crawler(crawler)
+
+    url = 'http://example.com/fiche'
+    request = Request(url, callback=spider.parse_detail)
+    response = downloader_mw.process_response(request, HtmlResponse(url, body=b'v1', request=request), spider)
+
+    def failing_callback(response):
+        raise ValueError("parsing impossible")
+        yield
+
+    with pytest.raises(ValueError):
+        list(spider_mw.process_spider_output(response, failing_callback(response), spider))
+    assert downloader_mw.store.get(url) is None
@@ -0,0 +1,149 @@
+"""
+Données synthétiques et doublures pour benchmark.py.
+
+- seed_mongo : capitales + N restaurants déterministes (graine fixe), au même
+  format que l'import (capitale_key, location, content_hash, last_updated) ;
+- seed_elasticsearch : synchronisation complète via database.py ;
+- FakeElasticsearch : doublure en mémoire qui répond aux recherches de l'API,
+  pour mesurer le serveur sans cluster (mode --in-process).
+
+Attention : le seeding vide les collections de la base cible et remplace le
+contenu des alias Elasticsearch. À réserver à une instance locale de test.
+"""
+
+import hashlib
+import json
+import random
+from datetime import datetime
+
+from utils import city_key
+
+
+# Capitales [lat, lon] du jeu synthétique
+CAPITALS = {
+    "Paris": [48.8566, 2.3522], "Dublin": [53.3498, -6.2603], "Berlin": [52.5200, 13.4050],
+    "Lisbonne": [38.7223, -9.1393], "Rome": [41.9028, 12.4964], "Madrid": [40.4168, -3.7038],
+    "Bruxelles": [50.8503, 4.3517], "Vienne": [48.2082, 16.3738], "Stockholm": [59.3293, 18.0686],
+    "Copenhague": [55.6761, 12.5683], "Budapest": [47.4979, 19.0402], "Athènes": [37.9838, 23.7275],
+    "Ljubljana": [46.0569, 14.5058], "Tallinn": [59.4370, 24.7535], "Vilnius": [54.6872, 25.2797],
+    "Nicosie": [35.1856, 33.3823], "Bratislava": [48.1486, 17.1077], "Prague": [50.0755, 14.4378],
+    "Varsovie": [52.2297, 21.0122], "Amsterdam": [52.3676, 4.9041],
+}
+CUISINES = ["Cuisine moderne", "Cuisine traditionnelle", "Créative", "Méditerranéenne",
+            "Fruits de mer", "Végétarienne", "Japonaise", "Italienne", "Bistrot", "Fusion"]
+WORDS = ["Maison", "Table", "Jardin", "Atelier", "Cave", "Comptoir", "Terrasse", "Marché",
+         "Étoile", "Port", "Vieux", "Petit", "Grand", "Bleu", "Rouge", "Saison"]
+
+SEED_BATCH_SIZE = 10000
+
+
+def _fingerprint(doc):
+    return hashlib.sha1(json.dumps(doc, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _geo(lat, lon):
+    return {'type': 'Point', 'coordinates': [lon, lat]}
+
+
+def generate_capitals():
+    now = datetime.now()
+    for name, (lat, lon) in CAPITALS.items():
+        doc = {
+            'capitale': name,
+            'capitale_key': city_key(name),
+            'description': f"Guide synthétique de {name}. " * 20,
+            'quand_partir': "D'avril à octobre",
+            'decalage': "0h",
+            'location': _geo(lat, lon),
+            'date_scraping': now.strftime("%d/%m/%Y"),
+        }
+        doc['content_hash'] = _fingerprint(doc)
+        doc['last_updated'] = now
+        yield doc
+
+
+def generate_restaurants(count, seed=42):
+    """`count` restaurants répartis sur les capitales, identiques pour une même graine"""
+    rng = random.Random(seed)
+    names = list(CAPITALS)
+    now = datetime.now()
+    for i in range(count):
+        capitale = names[i % len(names)]
+        lat, lon = CAPITALS[capitale]
+        lat += rng.uniform(-0.05, 0.05)
+        lon += rng.uniform(-0.08, 0.08)
+        doc = {
+            'nom': f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+            'capitale': capitale,
+            'capitale_key': city_key(capitale),
+            'adresse': f"{rng.randint(1, 200)} rue {rng.choice(WORDS)}, {capitale}",
+            'type_cuisine': rng.choice(CUISINES),
+            'description': " ".join(rng.choice(WORDS) for _ in range(40)),
+            'prix_niveau': rng.randint(1, 4),
+            'images': [f"https://example.org/img/{i}.jpg"],
+            'url': f"https://example.org/restaurant/{i}",
+            'location': _geo(round(lat, 6), round(lon, 6)),
+            'geo_precision': 'adresse',
+            'date_scraping': now.isoformat(),
+        }
+        doc['content_hash'] = _fingerprint(doc)
+        doc['last_updated'] = now
+        yield doc
+
+
+def _insert_batches(collection, docs, batch_size=SEED_BATCH_SIZE):
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def seed_mongo(db, restaurants, seed=42):
+    """Remplace capitales, restaurants et état de synchronisation de `db`"""
+    for name in ('capitales', 'restaurants', 'metadata'):
+        db[name].drop()
+    _insert_batches(db['capitales'], generate_capitals())
+    _insert_batches(db['restaurants'], generate_restaurants(restaurants, seed))
+
+    # Mêmes index que l'import (import_data_guide_voyage.py)
+    db['capitales'].create_index('capitale', unique=True)
+    db['capitales'].create_index('capitale_key')
+    db['restaurants'].create_index([('nom', 1), ('capitale', 1)], unique=True)
+    db['restaurants'].create_index([('capitale_key', 1), ('_id', 1)])
+    db['restaurants'].create_index([('location', '2dsphere')])
+    db['metadata'].insert_one({'_id': 'data_version', 'version': 1})
+
+
+def seed_elasticsearch(db, es):
+    """Indexe la base seedée comme le ferait database.py au démarrage"""
+    import database
+
+    for name in ('capitales', 'restaurants'):
+        database.sync_collection(db, es, name)
+    database.rebuild_suggestions(db, es)
+    es.indices.refresh(index='capitales,restaurants,suggestions')
+
+
+class FakeElasticsearch:
+    """Doublure en mémoire : recherche de capitales par préfixe, index vides sinon"""
+
+    def __init__(self, db):
+        self._capitals = list(db['capitales'].find({}, {'_id': 0}))
+        for cap in self._capitals:
+            lon, lat = cap['location']['coordinates']
+            cap['location'] = {'lat': lat, 'lon': lon}
+
+    def search(self, index, body=None, **kwargs):
+        if index != 'capitales':
+            return {"hits": {"total": {"value": 0}, "hits": []}, "aggregations": {}}
+        query = body["query"]["bool"]["should"][0]["match_phrase_prefix"]["capitale"]["query"]
+        query = query.casefold()
+        hits = [{"_source": dict(c)} for c in self._capitals if c['capitale'].casefold().startswith(query)]
+        return {"hits": {"total": {"value": len(hits)}, "hits": hits[:10]}}
+
+    def ping(self, **kwargs):
+        return True
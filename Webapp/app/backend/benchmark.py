@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Banc de charge reproductible de l'API.
+
+Trois façons d'obtenir un serveur à mesurer :
+
+1. Serveurs déjà lancés (ex: Flask contre ASGI, qui ne compresse pas ses réponses :
+   --accept-encoding identity pour comparer à travail égal) :
+    python benchmark.py --target flask=http://localhost:5000 \\
+                        --target async=http://localhost:5001 --accept-encoding identity
+
+2. Mongo et Elasticsearch locaux, remplis au préalable avec N restaurants
+   synthétiques (la base et les alias sont REMPLACÉS, instance de test seulement) :
+    python benchmark.py --seed-scale 100000 --mongo-uri mongodb://localhost:27017/ \\
+                        --es-host http://localhost:9200 --target flask=http://localhost:5000
+
+3. API Flask dans ce processus, avec mongomock et un faux Elasticsearch :
+    python benchmark.py --in-process --scale 10000
+
+Chaque client tire ses requêtes dans un mélange pondéré (capitales, recherche,
+restaurants d'une ville) avec une graine fixe. Le résultat (requêtes/s, p50,
+p95, p99 par route) est affiché et peut être écrit en JSON (--output) pour
+comparer deux commits.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+import aiohttp
+
+from bench_fixtures import CAPITALS
+
+
+CITY_NAMES = list(CAPITALS)
+
+# Mélange de requêtes : (route, poids, fabrique du chemin)
+REQUEST_MIX = [
+    ('capitals', 2, lambda rng: '/api/capitals'),
+    ('search', 5, lambda rng: '/api/search?q=' + quote(rng.choice(CITY_NAMES)[:rng.randint(2, 5)])),
+    ('restaurants', 3, lambda rng: '/api/restaurants/' + quote(rng.choice(CITY_NAMES))),
+]
+
+
+def percentile(sorted_values, p):
+    """Percentile par rang le plus proche (valeurs déjà triées)"""
+    if not sorted_values:
+        return 0.0
+    # Rang = ceil(p/100 * n) : round() arrondit au pair et sous-estime les hauts percentiles
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def fixed_paths_mix(paths):
+    """Mélange équiprobable de chemins fixes (option --path)"""
+    return [(path, 1, lambda rng, path=path: path) for path in paths]
+
+
+async def run_client(session, base_url, mix, rng, deadline, samples):
+    """Un client : enchaîne les requêtes du mélange jusqu'à l'échéance"""
+    weights = [weight for _, weight, _ in mix]
+    while time.monotonic() < deadline:
+        name, _, make_path = rng.choices(mix, weights)[0]
+        sample = samples.setdefault(name, {'latencies': [], 'errors': 0})
+        start = time.perf_counter()
+        try:
+            async with session.get(base_url + make_path(rng)) as response:
+                await response.read()
+                if response.status >= 400:
+                    sample['errors'] += 1
+                    continue
+        except aiohttp.ClientError:
+            sample['errors'] += 1
+            continue
+        sample['latencies'].append(time.perf_counter() - start)
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def bench_target(base_url, mix, concurrency, duration, warmup, seed, accept_encoding=None):
+    """Mesure une cible ; retourne les statistiques par route et au total"""
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else None
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+        if warmup:
+            # Chauffe : caches, pools de connexions, caches d'Elasticsearch
+            deadline = time.monotonic() + warmup
+            await asyncio.gather(*(
+                run_client(session, base_url, mix, random.Random(seed - i - 1), deadline, {})
+                for i in range(concurrency)
+            ))
+
+        samples = {}
+        start = time.monotonic()
+        await asyncio.gather(*(
+            run_client(session, base_url, mix, random.Random(seed + i), start + duration, samples)
+            for i in range(concurrency)
+        ))
+        elapsed = time.monotonic() - start
+
+    results = {
+        name: summarize(s['latencies'], s['errors'], elapsed)
+        for name, s in sorted(samples.items())
+    }
+    results['total'] = summarize(
+        [l for s in samples.values() for l in s['latencies']],
+        sum(s['errors'] for s in samples.values()),
+        elapsed,
+    )
+    return results
+
+
+def seed_backends(args):
+    """Remplit le Mongo et l'Elasticsearch locaux avec le jeu synthétique"""
+    from pymongo import MongoClient
+    from elasticsearch import Elasticsearch
+    from bench_fixtures import seed_elasticsearch, seed_mongo
+
+    db = MongoClient(args.mongo_uri)[args.database]
+    es = Elasticsearch([args.es_host])
+    start = time.monotonic()
+    print(f"🌱 Seeding de {args.seed_scale} restaurants dans {args.database}...", file=sys.stderr)
+    seed_mongo(db, args.seed_scale, args.seed)
+    seed_elasticsearch(db, es)
+    print(f"✅ Données prêtes en {time.monotonic() - start:.1f}s", file=sys.stderr)
+
+
+def start_in_process_server(scale, seed):
+    """Lance main.app dans un thread, sur mongomock et un faux Elasticsearch ; retourne l'URL"""
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("❌ Le mode --in-process nécessite mongomock (pip install mongomock)")
+    from werkzeug.serving import make_server
+    from bench_fixtures import FakeElasticsearch, seed_mongo
+    import clients
+
+    mongo = mongomock.MongoClient()
+    db = mongo[clients.MONGO_DATABASE]
+    seed_mongo(db, scale, seed)
+    # Clients du processus courant remplacés par les doublures
+    clients._clients.update({'pid': os.getpid(), 'mongo': mongo, 'es': FakeElasticsearch(db)})
+
+    import main
+    # Pas de journal d'accès : il coûterait plus cher que les requêtes mesurées
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, main.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_target(value):
+    name, sep, url = value.partition('=')
+    if not sep or not url:
+        raise argparse.ArgumentTypeError("format attendu : nom=http://hote:port")
+    return name, url.rstrip('/')
+
+
+def print_table(name, results):
+    print(f"\n🎯 {name}", file=sys.stderr)
+    print(f"{'route':<14}{'requêtes':>10}{'erreurs':>9}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}",
+          file=sys.stderr)
+    for route, r in results.items():
+        print(f"{route:<14}{r['requests']:>10}{r['errors']:>9}{r['rps']:>10.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de charge de l'API guide de voyage")
+    parser.add_argument('--target', type=parse_target, action='append', default=[],
+                        help="Serveur à mesurer, ex: flask=http://localhost:5000 (répétable)")
+    parser.add_argument('--in-process', action='store_true',
+                        help="Mesure main.app lancé ici sur mongomock et un faux Elasticsearch")
+    parser.add_argument('--scale', type=int, default=10000,
+                        help="Nombre de restaurants synthétiques en mode --in-process (défaut : 10000)")
+    parser.add_argument('--seed-scale', type=int,
+                        help="Remplit d'abord Mongo / Elasticsearch locaux avec N restaurants")
+    parser.add_argument('--mongo-uri', default=os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
+    parser.add_argument('--es-host', default=os.getenv("ES_HOST", "http://localhost:9200"))
+    parser.add_argument('--database', default=os.getenv("MONGO_DATABASE", "guide_voyage"))
+    parser.add_argument('--path', action='append', dest='paths',
+                        help="Chemin fixe à appeler à la place du mélange par défaut (répétable)")
+    parser.add_argument('--concurrency', type=int, default=50,
+                        help="Nombre de clients simultanés (défaut : 50)")
+    parser.add_argument('--duration', type=float, default=20,
+                        help="Durée de la mesure en secondes (défaut : 20)")
+    parser.add_argument('--warmup', type=float, default=3,
+                        help="Durée de chauffe en secondes (défaut : 3)")
+    parser.add_argument('--seed', type=int, default=42,
+                        help="Graine des données et du mélange de requêtes (défaut : 42)")
+    parser.add_argument('--accept-encoding',
+                        help="En-tête Accept-Encoding des clients, ex: identity (défaut : celui d'aiohttp)")
+    parser.add_argument('--output', help="Fichier JSON où écrire les résultats ('-' : sortie standard)")
+    args = parser.parse_args()
+
+    if args.seed_scale:
+        seed_backends(args)
+
+    targets = list(args.target)
+    if args.in_process:
+        targets.append(('in-process', start_in_process_server(args.scale, args.seed)))
+    if not targets:
+        parser.error("indiquer au moins une --target ou --in-process")
+
+    mix = fixed_paths_mix(args.paths) if args.paths else REQUEST_MIX
+    report = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'seed': args.seed,
+            'accept_encoding': args.accept_encoding,
+            'scale': args.seed_scale or (args.scale if args.in_process else None),
+            'mix': {name: weight for name, weight, _ in mix},
+        },
+        'results': {},
+    }
+
+    print(f"🚀 {args.concurrency} clients, {args.duration:.0f}s par cible", file=sys.stderr)
+    for name, url in targets:
+        results = asyncio.run(bench_target(url, mix, args.concurrency, args.duration,
+                                           args.warmup, args.seed, args.accept_encoding))
+        report['results'][name] = results
+        print_table(name, results)
+
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    elif args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Résultats écrits dans {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
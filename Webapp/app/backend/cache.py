@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from serialization import compress
+
+
+class CachedResponse:
+    """Corps JSON déjà sérialisé et son ETag fort"""
+
+    def __init__(self, body, version):
+        self.body = body
+        self.version = version
+        digest = hashlib.sha1(body.encode('utf-8')).hexdigest()
+        self.etag = f"v{version}-{digest[:20]}"
+        # Corps compressés, calculés à la première demande de chaque encodage
+        self._encoded = {}
+
+    def encoded(self, encoding):
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = compress(self.body.encode('utf-8'), encoding)
+        return data
+
+
+class VersionedCache:
+    """Cache en mémoire de réponses sérialisées, invalidé quand la version des données change
+
+    La version (incrémentée par l'import et la synchronisation) est relue au plus
+    une fois toutes les `check_interval` secondes : entre deux vérifications,
+    une réponse en cache ne coûte aucun aller-retour vers la base.
+    """
+
+    def __init__(self, version_loader, check_interval=5.0):
+        self._load_version = version_loader
+        self._check_interval = check_interval
+        self._version = None
+        self._checked_at = 0.0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def current_version(self):
+        now = time.monotonic()
+        version = self._fresh_version(now)
+        if version is None:
+            version = self._store_version(self._load_version(), now)
+        return version
+
+    def _fresh_version(self, now):
+        """Version connue si elle a été vérifiée récemment, sinon None"""
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self._check_interval:
+                return self._version
+        return None
+
+    def _store_version(self, version, now):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._checked_at = now
+            return version
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            return entry
+        return None
+
+    def set(self, key, body, version):
+        """Met en cache un corps construit à partir des données de `version`"""
+        entry = CachedResponse(body, version)
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = entry
+        return entry
+
+
+class AsyncVersionedCache(VersionedCache):
+    """VersionedCache dont la version est lue par une coroutine (API asynchrone)"""
+
+    async def current_version(self):
+        now = time.monotonic()
+        version = self._fresh_version(now)
+        if version is None:
+            version = self._store_version(await self._load_version(), now)
+        return version
+
+
+class _Flight:
+    """Calcul en cours partagé par les requêtes identiques"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QueryCache:
+    """Cache LRU borné, avec durée de vie, des résultats de requêtes fréquentes
+
+    - au plus `max_entries` entrées, la moins récemment utilisée est évincée ;
+    - une entrée expire après `ttl` secondes ou quand la version des données change ;
+    - single-flight : des requêtes identiques simultanées attendent le même
+      calcul au lieu de le relancer chacune.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60.0):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._version = None
+        self._entries = OrderedDict()  # clé -> (expiration, valeur)
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, version, compute):
+        """Retourne (valeur, origine) ; origine vaut 'hit', 'coalesced' ou 'miss'
+
+        Les erreurs de `compute` ne sont pas mises en cache : elles sont levées
+        chez l'appelant et chez les requêtes qui attendaient le même calcul.
+        """
+        with self._lock:
+            entry = self._lookup(key, version)
+            if entry is not None:
+                return entry[1], 'hit'
+            flight = self._flights.get((key, version))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(key, version)] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, 'coalesced'
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[(key, version)]
+                if flight.error is None:
+                    self._store(key, version, flight.value)
+            flight.done.set()
+        return flight.value, 'miss'
+
+    def _lookup(self, key, version):
+        """Entrée encore valide pour `key`, ou None (à appeler sous le verrou)"""
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            return entry
+        return None
+
+    def _store(self, key, version, value):
+        """Met en cache un résultat de `version` (à appeler sous le verrou)"""
+        if version != self._version:
+            return
+        self._entries[key] = (time.monotonic() + self._ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+class AsyncQueryCache(QueryCache):
+    """QueryCache dont le calcul est une coroutine (API asynchrone)
+
+    Les requêtes identiques attendent la même tâche au lieu de bloquer un thread.
+    """
+
+    async def get_or_compute(self, key, version, compute):
+        with self._lock:
+            entry = self._lookup(key, version)
+            if entry is not None:
+                return entry[1], 'hit'
+            flight = self._flights.get((key, version))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(key, version)] = asyncio.get_running_loop().create_future()
+
+        if not leader:
+            # shield : l'annulation d'une requête en attente n'annule pas le calcul partagé
+            return await asyncio.shield(flight), 'coalesced'
+
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            # Déjà levée chez l'appelant : pas d'avertissement si personne n'attendait
+            flight.exception()
+            raise
+        else:
+            flight.set_result(value)
+        finally:
+            with self._lock:
+                del self._flights[(key, version)]
+                if flight.done() and not flight.cancelled() and flight.exception() is None:
+                    self._store(key, version, flight.result())
+        return value, 'miss'
@@ -0,0 +1,92 @@
+"""
+Clients MongoDB et Elasticsearch de l'API, créés à la première utilisation.
+
+Gunicorn importe l'application dans le processus maître puis fork les workers :
+un MongoClient créé avant le fork partagerait ses sockets entre processus. Les
+clients sont donc créés paresseusement et recréés si le PID a changé, ce qui
+donne à chaque worker son propre pool de connexions.
+"""
+
+import os
+import threading
+import pymongo
+from pymongo import MongoClient
+from elasticsearch import Elasticsearch
+from metrics import MongoCommandTimer
+
+
+# --- CONFIGURATION DES URIS DOCKER ---
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb_guide:27017/")
+MONGO_DATABASE = os.getenv("MONGO_DATABASE", "guide_voyage")
+ES_URL = os.getenv("ES_HOST", "http://elasticsearch_guide:9200")
+
+# Pools et délais (par worker)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+ES_MAXSIZE = int(os.getenv("ES_MAXSIZE", "25"))
+ES_TIMEOUT = float(os.getenv("ES_TIMEOUT", "10"))
+
+_lock = threading.Lock()
+_clients = {'pid': None, 'mongo': None, 'es': None}
+
+
+def _ensure_clients():
+    """Crée les clients du processus courant (une fois par worker)"""
+    pid = os.getpid()
+    if _clients['pid'] == pid:
+        return _clients
+    with _lock:
+        if _clients['pid'] != pid:
+            # Clients hérités du processus parent : on les abandonne sans les
+            # fermer, leurs sockets appartiennent encore au parent
+            _clients['mongo'] = MongoClient(
+                MONGO_URI,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                connect=False,
+                # Durée de chaque commande, par collection (/metrics)
+                event_listeners=[MongoCommandTimer()],
+            )
+            _clients['es'] = Elasticsearch(
+                [ES_URL], retry_on_timeout=True, max_retries=3,
+                maxsize=ES_MAXSIZE, timeout=ES_TIMEOUT,
+            )
+            _clients['pid'] = pid
+    return _clients
+
+
+def get_mongo_client():
+    return _ensure_clients()['mongo']
+
+
+def get_db():
+    """Base guide_voyage du processus courant"""
+    return get_mongo_client()[MONGO_DATABASE]
+
+
+def get_es():
+    """Client Elasticsearch du processus courant"""
+    return _ensure_clients()['es']
+
+
+def check_mongo(timeout):
+    """Lève une exception si MongoDB ne répond pas dans les `timeout` secondes
+
+    pymongo.timeout borne toute l'opération, sélection du serveur comprise
+    (30 s par défaut sinon).
+    """
+    with pymongo.timeout(timeout):
+        get_mongo_client().admin.command('ping')
+
+
+def check_es(timeout):
+    """Lève une exception si le cluster Elasticsearch est injoignable ou rouge"""
+    health = get_es().cluster.health(request_timeout=timeout)
+    if health.get('status') == 'red':
+        raise RuntimeError("cluster Elasticsearch au statut red")
@@ -1,6 +1,13 @@
+import argparse
 import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pymongo import MongoClient
 from elasticsearch import Elasticsearch, helpers
+from elasticsearch.exceptions import TransportError
+from utils import city_key, clean_city_name
 import time
 
 
@@ -9,19 +16,578 @@ import time
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb_guide:27017/")
 ES_HOST = os.getenv("ES_HOST", "http://elasticsearch_guide:9200")
 
+# Collection Mongo qui mémorise l'état de la synchronisation (curseur)
+SYNC_STATE_COLLECTION = "metadata"
+# Marge de recouvrement : un import concurrent peut écrire, après le début d'une
+# synchronisation, des dates légèrement antérieures à ce début. Les documents
+# renvoyés sans changement sont écartés par Elasticsearch (versions externes).
+SYNC_OVERLAP = timedelta(seconds=int(os.getenv("SYNC_OVERLAP_SECONDS", "300")))
+# Suppressions enregistrées par l'import (--prune) : {collection, key, deleted_at}.
+# Doit rester identique à TOMBSTONE_COLLECTION dans import_data_guide_voyage.py
+TOMBSTONE_COLLECTION = "deletions"
+
+# Indexation en masse : lots bornés en documents ET en octets (heap ES de 512 Mo),
+# quelques threads d'envoi, et au plus BULK_QUEUE_SIZE lots en vol (backpressure)
+BULK_CHUNK_DOCS = int(os.getenv("BULK_CHUNK_DOCS", "500"))
+BULK_CHUNK_BYTES = int(os.getenv("BULK_CHUNK_BYTES", str(5 * 1024 * 1024)))
+BULK_THREADS = int(os.getenv("BULK_THREADS", "2"))
+BULK_QUEUE_SIZE = int(os.getenv("BULK_QUEUE_SIZE", "4"))
+BULK_MAX_RETRIES = int(os.getenv("BULK_MAX_RETRIES", "5"))
+BULK_INITIAL_BACKOFF = 1
+BULK_MAX_BACKOFF = 30
+# Taille des lots lus depuis le curseur Mongo
+MONGO_BATCH_SIZE = int(os.getenv("MONGO_BATCH_SIZE", "1000"))
+
+
+def capitale_doc_id(doc):
+    """Identifiant Elasticsearch d'une capitale (dérivé de son nom)"""
+    return doc['capitale'].strip().lower().replace(" ", "_")
+
+
+def restaurant_doc_id(doc):
+    """Identifiant Elasticsearch déterministe d'un restaurant, dérivé de (nom, capitale)"""
+    key = f"{doc['nom'].strip().lower()}|{doc['capitale'].strip().lower()}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+# Nombre de répliques une fois l'index construit (0 sur un cluster mono-nœud)
+ES_REPLICAS = int(os.getenv("ES_REPLICAS", "0"))
+# refresh_interval normal, rétabli après le chargement en masse
+ES_REFRESH_INTERVAL = os.getenv("ES_REFRESH_INTERVAL", "1s")
+
+# Définitions versionnées des index. Toute modification des mappings ou des
+# analyseurs doit incrémenter 'version' : la synchronisation construit alors
+# l'index physique <alias>_v<version> puis bascule l'alias dessus.
+INDEX_DEFINITIONS = {
+    'capitales': {
+        'version': 2,
+        'settings': {'number_of_shards': 1},
+        'mappings': {
+            'properties': {
+                'capitale': {
+                    'type': 'text', 'analyzer': 'french',
+                    'fields': {'raw': {'type': 'keyword'}},
+                },
+                'description': {'type': 'text', 'analyzer': 'french'},
+                'quand_partir': {'type': 'text', 'analyzer': 'french'},
+                'decalage': {'type': 'keyword'},
+                'location': {'type': 'geo_point'},
+                'url': {'type': 'keyword', 'index': False},
+                'date_scraping': {'type': 'keyword'},
+                'last_updated': {'type': 'date'},
+                'content_hash': {'type': 'keyword', 'index': False},
+            }
+        },
+    },
+    'restaurants': {
+        'version': 3,
+        'settings': {'number_of_shards': 1},
+        'mappings': {
+            'properties': {
+                'nom': {
+                    'type': 'text', 'analyzer': 'french',
+                    'fields': {'raw': {'type': 'keyword'}},
+                },
+                'capitale': {'type': 'keyword'},
+                # Filtre insensible à la casse de /api/restaurants/search
+                'capitale_key': {'type': 'keyword'},
+                'adresse': {'type': 'text'},
+                'location': {'type': 'geo_point'},
+                # 'adresse' (géocodée) ou 'ville' (centre de la capitale)
+                'geo_precision': {'type': 'keyword'},
+                'type_cuisine': {
+                    'type': 'text', 'analyzer': 'french',
+                    'fields': {'raw': {'type': 'keyword'}},
+                },
+                'description': {'type': 'text', 'analyzer': 'french'},
+                'prix_niveau': {'type': 'integer'},
+                'telephone': {'type': 'keyword', 'index': False},
+                'site_web': {'type': 'keyword', 'index': False},
+                'images': {'type': 'keyword', 'index': False},
+                'url': {'type': 'keyword', 'index': False},
+                'date_scraping': {'type': 'keyword'},
+                'last_updated': {'type': 'date'},
+                'content_hash': {'type': 'keyword', 'index': False},
+            }
+        },
+    },
+}
+
+# Index d'autocomplétion (/api/suggest), reconstruit entièrement à chaque changement :
+# capitales, restaurants et types de cuisine, pondérés par popularité
+SUGGEST_ALIAS = 'suggestions'
+SUGGEST_DEFINITION = {
+    'version': 1,
+    'settings': {
+        'number_of_shards': 1,
+        'analysis': {
+            'analyzer': {
+                # Insensible à la casse et aux accents : "ath" trouve "Athènes"
+                'suggest_folding': {
+                    'type': 'custom',
+                    'tokenizer': 'standard',
+                    'filter': ['lowercase', 'asciifolding'],
+                }
+            }
+        },
+    },
+    'mappings': {
+        'properties': {
+            'suggest': {'type': 'completion', 'analyzer': 'suggest_folding'},
+            'text': {'type': 'keyword'},
+            'type': {'type': 'keyword'},
+            'capitale': {'type': 'keyword'},
+        }
+    },
+}
+
+# Collection Mongo -> alias Elasticsearch, fonction d'id et champs qui la composent
+SYNC_TARGETS = {
+    'capitales': {
+        'index': 'capitales',
+        'doc_id': capitale_doc_id,
+        'key_fields': ('capitale',),
+    },
+    'restaurants': {
+        'index': 'restaurants',
+        'doc_id': restaurant_doc_id,
+        'key_fields': ('nom', 'capitale'),
+    },
+}
+
+
 def get_db_clients():
     """Retourne les clients Mongo et Elastic prêts à l'emploi"""
     print(f"🔗 Connexion Mongo : {MONGO_URI}")
     print(f"🔗 Connexion Elastic : {ES_HOST}")
-    
+
     mongo_client = MongoClient(MONGO_URI)
     # Pour ES 7.17, on passe l'hôte dans une liste
     es_client = Elasticsearch([ES_HOST])
     return mongo_client['guide_voyage'], es_client
 
-def migrate_data():
+
+def bump_data_version(db):
+    """Incrémente la version des données : l'API invalide alors ses caches"""
+    db[SYNC_STATE_COLLECTION].update_one(
+        {'_id': 'data_version'}, {'$inc': {'version': 1}}, upsert=True
+    )
+
+
+def get_sync_cursor(db, name):
+    """Début de la dernière synchronisation réussie d'une collection (None = jamais synchronisée)"""
+    state = db[SYNC_STATE_COLLECTION].find_one({'_id': f'sync_{name}'}) or {}
+    # Ancien format : dernier last_updated vu, repris une seule fois
+    return state.get('synced_until') or state.get('last_updated')
+
+
+def set_sync_cursor(db, name, started):
+    """Tout document modifié avant `started` est dans l'index"""
+    db[SYNC_STATE_COLLECTION].update_one(
+        {'_id': f'sync_{name}'},
+        {'$set': {'synced_until': started}, '$unset': {'last_updated': ''}},
+        upsert=True
+    )
+
+
+def es_version(last_updated):
+    """Version externe Elasticsearch d'un document : son last_updated en millisecondes"""
+    return int(last_updated.timestamp() * 1000)
+
+
+def iter_bulk_chunks(es, actions, max_docs=BULK_CHUNK_DOCS, max_bytes=BULK_CHUNK_BYTES):
+    """Sérialise les actions en NDJSON et les regroupe en lots bornés (documents et octets)"""
+    serializer = es.transport.serializer
+    chunk, size = [], 0
+    for action in actions:
+        meta = {'_index': action['_index'], '_id': action['_id']}
+        if '_version' in action:
+            meta.update(version=action['_version'], version_type=action['_version_type'])
+        meta = {action.get('_op_type', 'index'): meta}
+        lines = [serializer.dumps(meta).encode('utf-8') + b'\n']
+        if '_source' in action:
+            lines.append(serializer.dumps(action['_source']).encode('utf-8') + b'\n')
+        action_bytes = sum(len(line) for line in lines)
+
+        if chunk and (len(chunk) >= max_docs or size + action_bytes > max_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(lines)
+        size += action_bytes
+    if chunk:
+        yield chunk
+
+
+def send_chunk(es, chunk):
+    """Envoie un lot à l'API _bulk ; ce qui est refusé en 429 est renvoyé avec backoff exponentiel
+
+    Retourne (nombre de succès, nombre d'erreurs). Un 409 (version externe déjà
+    indexée : document renvoyé sans changement) ou la suppression d'un document
+    absent (404) n'est ni l'un ni l'autre.
+    """
+    succeeded = 0
+    for attempt in range(BULK_MAX_RETRIES + 1):
+        backoff = min(BULK_MAX_BACKOFF, BULK_INITIAL_BACKOFF * 2 ** attempt)
+        try:
+            response = es.bulk(body=b''.join(line for lines in chunk for line in lines))
+        except TransportError as e:
+            if e.status_code == 429 and attempt < BULK_MAX_RETRIES:
+                time.sleep(backoff)
+                continue
+            raise
+
+        rejected, errors = [], 0
+        for lines, item in zip(chunk, response['items']):
+            op_type, result = next(iter(item.items()))
+            status = result.get('status', 500)
+            if status == 429:
+                rejected.append(lines)
+            elif status == 409 or (op_type == 'delete' and status == 404):
+                # Déjà à jour : document inchangé, ou suppression déjà propagée
+                continue
+            elif status >= 300:
+                errors += 1
+            else:
+                succeeded += 1
+
+        if not rejected or attempt == BULK_MAX_RETRIES:
+            return succeeded, errors + len(rejected)
+        chunk = rejected
+        time.sleep(backoff)
+    return succeeded, len(chunk)
+
+
+def bulk_index(es, actions, label):
+    """Indexe un flux d'actions en parallèle, à mémoire bornée, et affiche le débit
+
+    Le flux est consommé au rythme des envois : au plus BULK_QUEUE_SIZE lots
+    attendent ou sont en cours d'envoi à un instant donné.
+    """
+    start = time.time()
+    totals = {'ok': 0, 'errors': 0}
+    lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(max(BULK_QUEUE_SIZE, BULK_THREADS))
+    failures = []
+
+    def on_done(future):
+        in_flight.release()
+        try:
+            ok, errors = future.result()
+        except Exception as e:
+            failures.append(e)
+            return
+        with lock:
+            totals['ok'] += ok
+            totals['errors'] += errors
+
+    with ThreadPoolExecutor(max_workers=BULK_THREADS) as pool:
+        for chunk in iter_bulk_chunks(es, actions):
+            in_flight.acquire()
+            if failures:
+                in_flight.release()
+                break
+            pool.submit(send_chunk, es, chunk).add_done_callback(on_done)
+
+    if failures:
+        raise failures[0]
+
+    elapsed = time.time() - start
+    rate = totals['ok'] / elapsed if elapsed > 0 else 0
+    print(f"   📈 {label}: {totals['ok']} documents en {elapsed:.1f}s "
+          f"({rate:.0f} docs/s), {totals['errors']} erreurs")
+    return totals['ok'], totals['errors']
+
+
+def physical_index_name(name):
+    """Nom de l'index physique correspondant à la version courante de la définition"""
+    return f"{SYNC_TARGETS[name]['index']}_v{INDEX_DEFINITIONS[name]['version']}"
+
+
+def alias_targets(es, alias):
+    """Index physiques derrière un alias (vide si l'alias n'existe pas)"""
+    if not es.indices.exists_alias(name=alias):
+        return []
+    return list(es.indices.get_alias(name=alias).keys())
+
+
+def es_location(location):
+    """Point GeoJSON Mongo [lon, lat] -> geo_point Elasticsearch {lat, lon}"""
+    lon, lat = location['coordinates']
+    return {'lat': lat, 'lon': lon}
+
+
+def iter_sync_actions(db, name, query, index):
+    """Génère les actions d'indexation depuis le curseur Mongo, sans rien matérialiser
+
+    Chaque document porte son last_updated comme version externe : renvoyer un
+    document déjà indexé dans cette version est refusé (409) sans rien réécrire.
+    """
+    target = SYNC_TARGETS[name]
+    cursor = db[name].find(query, {'_id': 0}).batch_size(MONGO_BATCH_SIZE)
+    for d in cursor:
+        if not all(d.get(f) for f in target['key_fields']):
+            continue
+        if d.get('location'):
+            d['location'] = es_location(d['location'])
+        action = {
+            "_index": index,
+            "_id": target['doc_id'](d),
+            "_source": d
+        }
+        if isinstance(d.get('last_updated'), datetime):
+            action.update(_version=es_version(d['last_updated']), _version_type='external')
+        yield action
+
+
+def load_into_new_index(es, physical, definition, actions, label):
+    """Crée un index physique et le remplit en masse, refresh et répliques désactivés
+
+    Les réglages normaux sont rétablis à la fin. En cas d'erreur, l'index
+    incomplet est supprimé et une exception est levée.
+    """
+    # Un index physique sans alias est un reste de construction interrompue
+    if es.indices.exists(index=physical):
+        es.indices.delete(index=physical)
+
+    settings = dict(definition['settings'], refresh_interval='-1', number_of_replicas=0)
+    es.indices.create(index=physical, body={'settings': settings, 'mappings': definition['mappings']})
+
+    loaded, errors = bulk_index(es, actions, label)
+    if errors:
+        # On garde l'ancien index en service plutôt que d'exposer un index incomplet
+        es.indices.delete(index=physical)
+        raise RuntimeError(f"{errors} erreurs pendant la construction de {physical}, alias inchangé")
+
+    es.indices.put_settings(index=physical, body={
+        'index': {'refresh_interval': ES_REFRESH_INTERVAL, 'number_of_replicas': ES_REPLICAS}
+    })
+    es.indices.refresh(index=physical)
+    return loaded
+
+
+def swap_alias(es, alias, physical):
+    """Bascule atomique : l'alias passe de l'ancien index au nouveau en une seule opération"""
+    previous = alias_targets(es, alias)
+    actions = [{'remove': {'index': old, 'alias': alias}} for old in previous]
+    if not previous and es.indices.exists(index=alias):
+        # Ancien index implicite portant directement le nom de l'alias
+        actions.append({'remove_index': {'index': alias}})
+    actions.append({'add': {'index': physical, 'alias': alias}})
+    es.indices.update_aliases(body={'actions': actions})
+
+    for old in previous:
+        if old != physical:
+            es.indices.delete(index=old)
+    print(f"🔀 Alias '{alias}' basculé sur {physical}")
+
+
+def rebuild_index(db, es, name):
+    """Construit la version courante de l'index puis bascule l'alias de façon atomique
+
+    Pendant le chargement, refresh et répliques sont désactivés : l'index n'est
+    pas encore visible par /api/search, qui lit toujours l'ancien via l'alias.
+    """
+    alias = SYNC_TARGETS[name]['index']
+    physical = physical_index_name(name)
+    print(f"🏗️  Construction de l'index {physical} (alias '{alias}')...")
+
+    started = datetime.now()
+    actions = iter_sync_actions(db, name, {}, physical)
+    synced = load_into_new_index(es, physical, INDEX_DEFINITIONS[name], actions, name)
+    swap_alias(es, alias, physical)
+
+    set_sync_cursor(db, name, started)
+    return synced
+
+
+def suggest_inputs(text, max_suffixes=3):
+    """Entrées de complétion : le texte entier, puis à partir de chacun des mots suivants
+
+    Le suggester "completion" ne complète que des préfixes : "usine" doit
+    aussi trouver "Le Café de l'Usine".
+    """
+    words = text.split()
+    inputs = [text]
+    for i in range(1, min(len(words), max_suffixes + 1)):
+        inputs.append(' '.join(words[i:]))
+    return inputs
+
+
+def iter_suggestions(db, index):
+    """Génère les suggestions typées, avec un poids de popularité
+
+    - capitale : nombre de restaurants de la ville
+    - cuisine : nombre de restaurants qui la proposent
+    - restaurant : poids de base (pas de signal de popularité dans les données)
+    """
+    restaurants_per_city = {
+        row['_id']: row['count']
+        for row in db['restaurants'].aggregate([
+            {'$group': {'_id': '$capitale_key', 'count': {'$sum': 1}}}
+        ])
+    }
+
+    for cap in db['capitales'].find({}, {'_id': 0, 'capitale': 1}).batch_size(MONGO_BATCH_SIZE):
+        name = clean_city_name(cap.get('capitale', ''))
+        if not name:
+            continue
+        yield {
+            '_index': index,
+            '_id': f"capitale:{city_key(name)}",
+            '_source': {
+                'text': name, 'type': 'capitale', 'capitale': name,
+                'suggest': {'input': [name], 'weight': 1 + restaurants_per_city.get(city_key(name), 0)},
+            },
+        }
+
+    cuisines = {}
+    for row in db['restaurants'].aggregate([
+        {'$match': {'type_cuisine': {'$exists': True}}},
+        {'$group': {'_id': '$type_cuisine', 'count': {'$sum': 1}}},
+    ]):
+        for cuisine in str(row['_id']).split(','):
+            cuisine = cuisine.strip()
+            if cuisine:
+                cuisines[cuisine] = cuisines.get(cuisine, 0) + row['count']
+    for cuisine, count in cuisines.items():
+        yield {
+            '_index': index,
+            '_id': f"cuisine:{city_key(cuisine)}",
+            '_source': {
+                'text': cuisine, 'type': 'cuisine', 'capitale': None,
+                'suggest': {'input': suggest_inputs(cuisine), 'weight': 1 + count},
+            },
+        }
+
+    projection = {'_id': 0, 'nom': 1, 'capitale': 1}
+    for resto in db['restaurants'].find({}, projection).batch_size(MONGO_BATCH_SIZE):
+        if not resto.get('nom') or not resto.get('capitale'):
+            continue
+        yield {
+            '_index': index,
+            '_id': f"restaurant:{restaurant_doc_id(resto)}",
+            '_source': {
+                'text': resto['nom'], 'type': 'restaurant', 'capitale': resto['capitale'],
+                'suggest': {'input': suggest_inputs(resto['nom']), 'weight': 1},
+            },
+        }
+
+
+def rebuild_suggestions(db, es):
+    """Reconstruit l'index d'autocomplétion dans un nouvel index puis bascule l'alias"""
+    physical = f"{SUGGEST_ALIAS}_v{SUGGEST_DEFINITION['version']}_{int(time.time())}"
+    print(f"🏗️  Construction de l'index d'autocomplétion {physical}...")
+    loaded = load_into_new_index(es, physical, SUGGEST_DEFINITION,
+                                 iter_suggestions(db, physical), SUGGEST_ALIAS)
+    swap_alias(es, SUGGEST_ALIAS, physical)
+    return loaded
+
+
+def suggestions_outdated(es):
+    """Vrai si l'alias d'autocomplétion manque ou pointe sur une ancienne version"""
+    prefix = f"{SUGGEST_ALIAS}_v{SUGGEST_DEFINITION['version']}_"
+    targets = alias_targets(es, SUGGEST_ALIAS)
+    return not any(t.startswith(prefix) for t in targets)
+
+
+def sync_collection(db, es, name, full_reconcile=False):
+    """Synchronise une collection : documents modifiés depuis la dernière fois, puis suppressions
+
+    Retourne (documents réellement modifiés dans l'index, documents supprimés) :
+    ceux renvoyés par la marge de recouvrement sans avoir changé ne comptent pas.
+
+    Les suppressions viennent des tombstones de l'import ; full_reconcile compare
+    en plus tous les ids de l'index à ceux de Mongo (suppressions faites à la main).
+
+    Si l'alias ne pointe pas sur la version courante de l'index, on reconstruit
+    entièrement un nouvel index avant de basculer l'alias.
+    """
+    index = SYNC_TARGETS[name]['index']
+
+    if physical_index_name(name) not in alias_targets(es, index):
+        return rebuild_index(db, es, name), 0
+
+    # Curseur : début de la dernière synchronisation réussie, et non le plus
+    # récent last_updated vu (qui ramènerait à chaque démarrage le dernier import)
+    started = datetime.now()
+    since = get_sync_cursor(db, name)
+    query = {'last_updated': {'$gte': since - SYNC_OVERLAP}} if since else {}
+
+    # Lecture en flux depuis le curseur : rien n'est matérialisé en mémoire
+    synced, errors = bulk_index(es, iter_sync_actions(db, name, query, index), name)
+
+    deleted, delete_errors = propagate_deletes(db, es, name, since)
+    if full_reconcile:
+        deleted += reconcile_deletes(db, es, name)
+
+    # On n'avance le curseur que si tout l'envoi a réussi
+    if errors == 0 and delete_errors == 0:
+        set_sync_cursor(db, name, started)
+        # Tombstones antérieures à la marge de recouvrement : déjà propagées
+        db[TOMBSTONE_COLLECTION].delete_many(
+            {'collection': name, 'deleted_at': {'$lt': started - SYNC_OVERLAP}}
+        )
+
+    return synced, deleted
+
+
+def propagate_deletes(db, es, name, since):
+    """Supprime de l'index les documents dont l'import a enregistré la suppression
+
+    Seules les tombstones écrites depuis `since` (marge comprise) sont lues : le
+    travail suit le nombre de suppressions, pas la taille des données. Un document
+    réimporté depuis sa suppression est laissé dans l'index.
+    Retourne (documents supprimés, erreurs).
+    """
+    target = SYNC_TARGETS[name]
+    index = target['index']
+    query = {'collection': name}
+    if since:
+        query['deleted_at'] = {'$gte': since - SYNC_OVERLAP}
+
+    def stale():
+        for tombstone in db[TOMBSTONE_COLLECTION].find(query, {'key': 1}).batch_size(MONGO_BATCH_SIZE):
+            key = tombstone['key']
+            if db[name].find_one(key, {'_id': 1}) is None:
+                yield {"_op_type": "delete", "_index": index, "_id": target['doc_id'](key)}
+
+    return bulk_index(es, stale(), f"{name} (suppressions)")
+
+
+def reconcile_deletes(db, es, name):
+    """Supprime de l'index tout document absent de Mongo (--full-reconcile)
+
+    Parcourt tous les ids des deux côtés : coûteux, réservé aux suppressions
+    faites hors de l'import. Comparer les nombres de documents ne suffirait pas :
+    des ajouts masqueraient les suppressions.
+    """
+    target = SYNC_TARGETS[name]
+    index = target['index']
+
+    if not es.indices.exists(index=index):
+        return 0
+    es.indices.refresh(index=index)
+
+    projection = {f: 1 for f in target['key_fields']}
+    projection['_id'] = 0
+    mongo_ids = {
+        target['doc_id'](d)
+        for d in db[name].find({}, projection)
+        if all(d.get(f) for f in target['key_fields'])
+    }
+
+    stale = (
+        {"_op_type": "delete", "_index": index, "_id": hit['_id']}
+        for hit in helpers.scan(es, index=index, query={"query": {"match_all": {}}}, _source=False)
+        if hit['_id'] not in mongo_ids
+    )
+    deleted, _ = bulk_index(es, stale, f"{name} (suppressions)")
+    return deleted
+
+
+def migrate_data(full_reconcile=False):
     db, es = get_db_clients()
-    
+
     # 1. Attente Elasticsearch (Boot check)
     print("⏳ Vérification de la disponibilité d'Elasticsearch...")
     for i in range(10):
@@ -38,43 +604,32 @@ def migrate_data():
         print("👉 Vérifie que ton conteneur 'elasticsearch_guide' est bien démarré (docker ps)")
         return
 
-    # 2. Migration des Capitales
-    print("📤 Migration des capitales...")
-    villes = list(db['capitales'].find({}, {'_id': 0}))
-    if villes:
-        actions = []
-        for v in villes:
-            # On nettoie le nom de la capitale pour l'ID
-            doc_id = v['capitale'].strip().lower().replace(" ", "_")
-            actions.append({
-                "_index": "capitales",
-                "_id": doc_id,
-                "_source": v
-            })
-        
-        helpers.bulk(es, actions)
-        print(f"✅ {len(villes)} villes synchronisées vers Elasticsearch.")
-    else:
-        print("⚠️ Aucune capitale trouvée dans MongoDB (collection 'capitales' vide).")
-
-    # 3. Migration des Restaurants
-    print("📤 Migration des restaurants...")
-    restos = list(db['restaurants'].find({}, {'_id': 0}))
-    if restos:
-        actions = [{
-            "_index": "restaurants",
-            "_source": r
-        } for r in restos]
-        
-        helpers.bulk(es, actions)
-        print(f"✅ {len(restos)} restaurants synchronisés vers Elasticsearch.")
-    else:
-        print("⚠️ Aucun restaurant trouvé dans MongoDB (collection 'restaurants' vide).")
+    # 2. Synchronisation incrémentale des capitales puis des restaurants
+    changes = 0
+    for name in ('capitales', 'restaurants'):
+        print(f"📤 Synchronisation des {name}...")
+        if db[name].estimated_document_count() == 0:
+            print(f"⚠️ Aucun document trouvé dans MongoDB (collection '{name}' vide).")
+        synced, deleted = sync_collection(db, es, name, full_reconcile)
+        changes += synced + deleted
+        print(f"✅ {synced} {name} modifiés envoyés, {deleted} supprimés dans Elasticsearch.")
+
+    # 3. Autocomplétion : dérivée des deux collections, reconstruite si elles ont changé
+    if changes or suggestions_outdated(es):
+        rebuild_suggestions(db, es)
+
+    if changes:
+        bump_data_version(db)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synchronisation MongoDB -> Elasticsearch")
+    parser.add_argument('--full-reconcile', action='store_true',
+                        help="Compare aussi tous les ids de l'index à ceux de Mongo (suppressions hors import)")
+    args = parser.parse_args()
+
     print("============================================================")
     print("🚀 DÉMARRAGE DE LA SYNCHRONISATION MONGO -> ELASTIC")
     print("============================================================")
-    migrate_data()
+    migrate_data(args.full_reconcile)
     print("============================================================")
-    print("✨ Opération terminée !")
\ No newline at end of file
+    print("✨ Opération terminée !")
@@ -0,0 +1,36 @@
+# Configuration Gunicorn de l'API (mode production)
+# Lancement : gunicorn -c gunicorn.conf.py main:app
+
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Un worker par cœur : chaque worker ouvre ses propres pools Mongo / Elasticsearch
+# après le fork (clients.py)
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Threads par worker : les requêtes attendent surtout Mongo et Elasticsearch
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+# Import de l'application une seule fois dans le maître (aucune connexion n'y est ouverte)
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recyclage périodique des workers (fuites mémoire éventuelles)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def child_exit(server, worker):
+    """Retire de /metrics les jauges d'un worker arrêté (mode multiprocessus)"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,102 +1,366 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from pymongo import MongoClient
-from elasticsearch import Elasticsearch
 import os
-from utils import get_city_coordinates
+from cache import CachedResponse, QueryCache, VersionedCache
+from clients import check_es, check_mongo, get_db, get_es
+import metrics
+from queries import (
+    BUNDLE_PROJECTION, BadRequest, CAPITAL_REQUIRED_FIELDS, INTERNAL_FIELDS, PUBLIC_PROJECTION,
+    add_display_fields, assemble_bundle, bundle_keys, capital_search_body, keep_fields,
+    location_lat_lon, normalize_search_query, page_query, parse_list_params, restaurants_city_query, split_page,
+)
+from serialization import (
+    COMPRESS_MIN_SIZE, FastJSONProvider, compress_response, negotiate_encoding,
+    streamed_json_response,
+)
+from utils import city_key, clean_city_name
 
 app = Flask(__name__)
-CORS(app)
-
-# --- CONFIGURATION DES URIS DOCKER ---
-# On utilise les noms des services définis dans ton docker-compose.yml
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb_guide:27017/")
-ES_URL = os.getenv("ES_HOST", "http://elasticsearch_guide:9200")
-
-# Connexions
-mongo_client = MongoClient(MONGO_URI)
-db = mongo_client['guide_voyage']
-# Configuration robuste pour Elasticsearch
-es = Elasticsearch([ES_URL], retry_on_timeout=True, max_retries=3)
-
-def clean_city_name(name):
-    """Nettoie le nom pour correspondre au dictionnaire de coordonnées"""
-    if not name: return ""
-    clean = name
-    # 1. Retrait des préfixes de guide
-    prefixes = ["Guide de voyage et vacances à ", "Guide de voyage ", "Visiter ", "Vacances à "]
-    for prefix in prefixes:
-        clean = clean.replace(prefix, "")
-    
-    # 2. TRÈS IMPORTANT : On coupe à la virgule pour éviter "Nicosie, Chypre"
-    # Cela permet de trouver "Nicosie" dans ton dictionnaire utils.py
-    clean = clean.split(',')[0].strip()
-    return clean
+# Encodeur rapide (orjson si disponible) pour jsonify et app.json.dumps
+app.json = FastJSONProvider(app)
+# X-Next-Cursor doit être lisible par le frontend pour demander la page suivante
+CORS(app, expose_headers=['X-Next-Cursor', 'ETag'])
+# Latences, tailles de réponse et /metrics (avant la compression, voir metrics.init_app)
+metrics.init_app(app)
+
+# Les connexions sont créées à la première requête de chaque worker (clients.py)
+# Délai maximal des vérifications de /readyz, en secondes
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", "2"))
+
+
+def load_data_version():
+    """Version des données, incrémentée par l'import et la synchronisation"""
+    doc = get_db()['metadata'].find_one({'_id': 'data_version'}, {'version': 1})
+    return doc.get('version', 0) if doc else 0
+
+
+# Réponses sérialisées, invalidées quand la version des données change
+response_cache = VersionedCache(
+    load_data_version,
+    check_interval=float(os.getenv("DATA_VERSION_CHECK_SECONDS", "5"))
+)
+
+
+def es_search(index, body):
+    """Recherche Elasticsearch chronométrée par index"""
+    with metrics.track_es(index):
+        return get_es().search(index=index, body=body)
+
+# Résultats de /api/search par requête normalisée : la frappe au clavier renvoie
+# sans cesse les mêmes préfixes. Vidé quand la version des données change.
+search_cache = QueryCache(
+    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "60"))
+)
+
+
+@app.after_request
+def compress_json(response):
+    """Compresse les réponses JSON selon Accept-Encoding (gzip, brotli)"""
+    return compress_response(response, request.accept_encodings)
+
+
+def cached_json_response(entry):
+    """Réponse JSON avec ETag ; 304 sans corps si le client a déjà cette version
+
+    Le corps compressé est gardé dans l'entrée : une réponse en cache n'est
+    compressée qu'une fois par encodage. L'ETag devient alors faible.
+    """
+    encoding = None
+    if request.if_none_match.contains_weak(entry.etag):
+        response = Response(status=304)
+    else:
+        if len(entry.body) >= COMPRESS_MIN_SIZE:
+            encoding = negotiate_encoding(request.accept_encodings)
+        if encoding:
+            response = Response(entry.encoded(encoding), mimetype='application/json')
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag, weak=encoding is not None)
+    response.vary.add('Accept-Encoding')
+    # Le navigateur garde la réponse mais revalide à chaque chargement de la carte
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def find_page(collection, query, params, required_fields=()):
+    """Page de documents triés par _id, avec projection poussée dans la requête Mongo
+
+    Retourne (documents, curseur de la page suivante ou None).
+    """
+    query, projection, fetch = page_query(query, params, required_fields)
+    cursor = collection.find(query, projection).sort('_id', 1)
+    if fetch:
+        cursor = cursor.limit(fetch)
+    return split_page(list(cursor), params)
+
+
+def page_response(docs, next_cursor):
+    """Réponse d'une page : ETag calculé sur le corps, curseur suivant en en-tête"""
+    entry = CachedResponse(app.json.dumps(docs), response_cache.current_version())
+    response = cached_json_response(entry)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Vivacité : le worker répond, sans interroger Mongo ni Elasticsearch"""
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Disponibilité : 503 si MongoDB ou Elasticsearch ne répond pas"""
+    checks = {}
+    for name, check in (('mongodb', check_mongo), ('elasticsearch', check_es)):
+        try:
+            check(READY_TIMEOUT)
+            checks[name] = "ok"
+        except Exception as e:
+            checks[name] = f"erreur: {e}"
+    ready = all(v == "ok" for v in checks.values())
+    response = jsonify({"status": "ok" if ready else "unavailable", "checks": checks})
+    response.headers['Cache-Control'] = 'no-store'
+    return response, 200 if ready else 503
 
 @app.route('/api/capitals', methods=['GET'])
 def get_capitals():
     try:
-        # On récupère tout de MongoDB sans filtre pour garder photos et liens
-        capitales = list(db['capitales'].find({}, {'_id': 0}))
-        for cap in capitales:
-            nom_propre = clean_city_name(cap.get('capitale', ''))
-            cap['capitale_display'] = nom_propre
-            
-            # Récupération des coordonnées (utils.py)
-            coords = get_city_coordinates(nom_propre)
-            cap['lat'] = coords[0]
-            cap['lon'] = coords[1]
-        return jsonify(capitales)
+        params = parse_list_params(request.args)
+        if params is not None:
+            capitales, next_cursor = find_page(get_db()['capitales'], {}, params, required_fields=CAPITAL_REQUIRED_FIELDS)
+            for cap in capitales:
+                add_display_fields(cap)
+            return page_response(keep_fields(capitales, params['fields']), next_cursor)
+        
+        version = response_cache.current_version()
+        entry = response_cache.get('capitals', version)
+        metrics.record_cache('capitals', 'hit' if entry is not None else 'miss')
+        if entry is None:
+            # On récupère tout de MongoDB sans filtre pour garder photos et liens
+            capitales = list(get_db()['capitales'].find({}, PUBLIC_PROJECTION))
+            for cap in capitales:
+                add_display_fields(cap)
+            entry = response_cache.set('capitals', app.json.dumps(capitales), version)
+        return cached_json_response(entry)
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Erreur Mongo: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/cities/bundle', methods=['GET'])
+def cities_bundle():
+    """Capitales et leurs restaurants en un aller-retour : ?names=Paris,Rome,...
+
+    Une seule requête $in par collection (champ capitale_key indexé), quel que
+    soit le nombre de villes demandées.
+    """
+    try:
+        keys = bundle_keys(request.args.get('names'))
+        version = response_cache.current_version()
+        lookup = {'capitale_key': {'$in': list(set(keys.values()))}}
+        capitales = list(get_db()['capitales'].find(lookup, BUNDLE_PROJECTION))
+        restaurants = list(get_db()['restaurants'].find(lookup, BUNDLE_PROJECTION))
+        bundle = assemble_bundle(keys, capitales, restaurants)
+        return cached_json_response(CachedResponse(app.json.dumps(bundle), version))
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Erreur Bundle: {e}")
+        return jsonify({"error": str(e)}), 500
+
+def run_capital_search(query):
+    """Recherche Elasticsearch des capitales ; retourne le corps JSON sérialisé"""
+    # Requête Elasticsearch compatible avec ta version (queries.py)
+    res = es_search("capitales", capital_search_body(query))
+    results = [hit["_source"] for hit in res["hits"]["hits"]]
+    for r in results:
+        add_display_fields(r)
+    return app.json.dumps(results)
+
 @app.route('/api/search', methods=['GET'])
 def search():
-    query = request.args.get('q', '').strip()
+    query = normalize_search_query(request.args.get('q', ''))
     if not query: return jsonify([])
 
-    # Requête Elasticsearch compatible avec ta version
+    try:
+        # Une seule recherche Elasticsearch pour une rafale de requêtes identiques
+        body, result = search_cache.get_or_compute(
+            query, response_cache.current_version(), lambda: run_capital_search(query)
+        )
+        metrics.record_cache('search', result)
+        return Response(body, mimetype='application/json')
+    except Exception as e:
+        print(f"Erreur Elastic Search: {e}")
+        return jsonify([])
+
+# Nombre maximum de suggestions renvoyées par /api/suggest
+MAX_SUGGESTIONS = 20
+
+@app.route('/api/suggest', methods=['GET'])
+def suggest():
+    """Autocomplétion typée (capitale, restaurant, cuisine), classée par popularité"""
+    prefix = request.args.get('q', '').strip()
+    if not prefix: return jsonify([])
+    size = request.args.get('size', '8')
+    size = min(int(size), MAX_SUGGESTIONS) if size.isdigit() and int(size) > 0 else 8
+
+    completion = {"field": "suggest", "size": size, "skip_duplicates": True}
+    if len(prefix) >= 4:
+        # Tolère une faute de frappe une fois le début du mot saisi
+        completion["fuzzy"] = {"fuzziness": 1}
     body = {
-        "query": {
-            "bool": {
-                "should": [
-                    { "match_phrase_prefix": { "capitale": { "query": query, "boost": 10 } } },
-                    { "match": { "capitale": { "query": query, "fuzziness": "AUTO" } } }
-                ]
-            }
-        }
+        "_source": ["text", "type", "capitale"],
+        "suggest": {"suggestions": {"prefix": prefix, "completion": completion}}
     }
-    
+
     try:
-        # Utilisation de 'body' pour la recherche Elastic
-        res = es.search(index="capitales", body=body)
-        results = [hit["_source"] for hit in res["hits"]["hits"]]
-        for r in results:
-            nom_propre = clean_city_name(r.get('capitale', ''))
-            r['capitale_display'] = nom_propre
-            coords = get_city_coordinates(nom_propre)
-            r['lat'] = coords[0]
-            r['lon'] = coords[1]
-        return jsonify(results)
+        res = es_search("suggestions", body)
+        options = res["suggest"]["suggestions"][0]["options"]
+        return jsonify([
+            {**option["_source"], "score": option["_score"]}
+            for option in options
+        ])
     except Exception as e:
-        print(f"Erreur Elastic Search: {e}")
+        print(f"Erreur Elastic Suggest: {e}")
         return jsonify([])
 
+# Taille maximale d'une page de /api/restaurants/search
+MAX_SEARCH_SIZE = 50
+# Agrégations renvoyées comme facettes : nom dans la réponse -> champ Elasticsearch
+RESTAURANT_FACETS = {
+    "type_cuisine": "type_cuisine.raw",
+    "prix_niveau": "prix_niveau",
+    "capitale": "capitale",
+}
+
+@app.route('/api/restaurants/search', methods=['GET'])
+def search_restaurants():
+    """Recherche plein texte de restaurants, filtres et facettes en un seul appel Elasticsearch
+
+    Paramètres : q, capitale (liste séparée par des virgules), prix_niveau
+    (liste d'entiers), size, from.
+    """
+    query = request.args.get('q', '').strip()
+    try:
+        size = min(int(request.args.get('size', 20)), MAX_SEARCH_SIZE)
+        offset = int(request.args.get('from', 0))
+        prix = [int(p) for p in request.args.get('prix_niveau', '').split(',') if p.strip()]
+    except ValueError:
+        return jsonify({"error": "size, from et prix_niveau doivent être des entiers"}), 400
+    if size < 0 or offset < 0:
+        return jsonify({"error": "size et from doivent être positifs"}), 400
+
+    if query:
+        must = [{"multi_match": {
+            "query": query,
+            "fields": ["nom^3", "type_cuisine^2", "description"],
+            "fuzziness": "AUTO"
+        }}]
+    else:
+        must = [{"match_all": {}}]
+
+    filters = []
+    villes = [c for c in request.args.get('capitale', '').split(',') if c.strip()]
+    if villes:
+        filters.append({"terms": {"capitale_key": [city_key(clean_city_name(c)) for c in villes]}})
+    if prix:
+        filters.append({"terms": {"prix_niveau": prix}})
+
+    body = {
+        "query": {"bool": {"must": must, "filter": filters}},
+        "aggs": {
+            name: {"terms": {"field": field, "size": 30}}
+            for name, field in RESTAURANT_FACETS.items()
+        },
+        "from": offset,
+        "size": size,
+        "_source": {"excludes": list(INTERNAL_FIELDS)},
+    }
+
+    try:
+        res = es_search("restaurants", body)
+        return jsonify({
+            "total": res["hits"]["total"]["value"],
+            "results": [hit["_source"] for hit in res["hits"]["hits"]],
+            "facets": {
+                name: [{"value": b["key"], "count": b["doc_count"]} for b in agg["buckets"]]
+                for name, agg in res["aggregations"].items()
+            },
+        })
+    except Exception as e:
+        print(f"Erreur Elastic Restaurants: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# Rayon par défaut et maximal (en mètres) de /api/restaurants/near
+DEFAULT_NEAR_RADIUS = 2000
+MAX_NEAR_RADIUS = 50000
+MAX_NEAR_RESULTS = 100
+
+@app.route('/api/restaurants/near', methods=['GET'])
+def restaurants_near():
+    """Restaurants dans un rayon autour d'un point, du plus proche au plus lointain
+
+    Paramètres : lat, lon, radius (mètres), limit. Chaque restaurant porte
+    distance_m ; seuls ceux dont l'adresse a été géocodée à l'import ont une position.
+    """
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius = float(request.args.get('radius', DEFAULT_NEAR_RADIUS))
+        limit = int(request.args.get('limit', 20))
+    except (KeyError, ValueError):
+        return jsonify({"error": "lat et lon sont requis ; radius et limit doivent être numériques"}), 400
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({"error": "lat ou lon hors limites"}), 400
+    if not 0 < radius <= MAX_NEAR_RADIUS or not 1 <= limit <= MAX_NEAR_RESULTS:
+        return jsonify({"error": f"radius doit être entre 0 et {MAX_NEAR_RADIUS}, limit entre 1 et {MAX_NEAR_RESULTS}"}), 400
+
+    # $geoNear utilise l'index 2dsphere : filtre par rayon et tri par distance côté Mongo
+    pipeline = [
+        {"$geoNear": {
+            "near": {"type": "Point", "coordinates": [lon, lat]},
+            "distanceField": "distance_m",
+            "maxDistance": radius,
+            "spherical": True,
+        }},
+        {"$limit": limit},
+        {"$project": PUBLIC_PROJECTION},
+    ]
+    try:
+        restos = list(get_db()['restaurants'].aggregate(pipeline))
+        for r in restos:
+            r['distance_m'] = round(r['distance_m'])
+            r['lat'], r['lon'] = location_lat_lon(r.pop('location'))
+        return jsonify(restos)
+    except Exception as e:
+        print(f"Erreur Restaurants proches: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# Documents lus par aller-retour Mongo pour les réponses en flux
+STREAM_BATCH_SIZE = 500
+
 @app.route('/api/restaurants/<city_name>', methods=['GET'])
 def get_restaurants(city_name):
     try:
-        # On nettoie le nom reçu pour la requête Mongo
-        clean = clean_city_name(city_name)
-        query = {"$or": [
-            {"capitale": {"$regex": f"^{clean}$", "$options": "i"}},
-            {"ville": {"$regex": f"^{clean}$", "$options": "i"}}
-        ]}
-        restos = list(db['restaurants'].find(query, {'_id': 0}))
-        return jsonify(restos)
+        query = restaurants_city_query(city_name)
+        params = parse_list_params(request.args)
+        if params is not None:
+            # Index (capitale_key, _id) : filtre, tri et curseur servis par l'index
+            restos, next_cursor = find_page(get_db()['restaurants'], query, params)
+            return page_response(restos, next_cursor)
+        # Liste complète écrite au fil du curseur : mémoire constante, premiers octets immédiats
+        cursor = get_db()['restaurants'].find(query, PUBLIC_PROJECTION).batch_size(STREAM_BATCH_SIZE)
+        return streamed_json_response(cursor, request.accept_encodings)
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Erreur Restaurants: {e}")
         return jsonify([])
 
 if __name__ == '__main__':
+    # Serveur de développement ; en production : gunicorn -c gunicorn.conf.py main:app
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
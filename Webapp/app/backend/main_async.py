@@ -0,0 +1,162 @@
+"""
+Mode de service asynchrone (ASGI) de l'API : mêmes routes et mêmes corps JSON que
+main.py pour /api/capitals, /api/search et /api/restaurants/<city_name>, mais
+avec Quart, motor et AsyncElasticsearch. Un seul processus garde ainsi de
+nombreux appels Mongo / Elasticsearch en vol au lieu d'un thread bloqué par
+requête.
+
+Requêtes (queries.py), encodeur JSON (serialization.py, dates en ISO 8601) et
+caches (cache.py) sont ceux de main.py. Les réponses ne sont en revanche pas
+compressées : le comparer à l'API Flask (benchmark.py) sans Accept-Encoding.
+
+Lancement : hypercorn main_async:app --bind 0.0.0.0:5001
+"""
+
+from quart import Quart, Response, jsonify, request
+from quart_cors import cors
+from motor.motor_asyncio import AsyncIOMotorClient
+from elasticsearch import AsyncElasticsearch
+import os
+from cache import AsyncQueryCache, AsyncVersionedCache, CachedResponse
+from queries import (
+    BadRequest, CAPITAL_REQUIRED_FIELDS, PUBLIC_PROJECTION, add_display_fields,
+    capital_search_body, keep_fields, normalize_search_query, page_query, parse_list_params,
+    restaurants_city_query, split_page,
+)
+from serialization import FastJSONProvider
+
+app = Quart(__name__)
+# Même encodeur que main.py (le fournisseur par défaut de Quart écrit les dates au format HTTP)
+app.json = FastJSONProvider(app)
+app = cors(app, allow_origin='*', expose_headers=['X-Next-Cursor', 'ETag'])
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb_guide:27017/")
+ES_URL = os.getenv("ES_HOST", "http://elasticsearch_guide:9200")
+# Connexions HTTP simultanées vers Elasticsearch (10 par défaut dans le client)
+ES_CONNECTIONS = int(os.getenv("ES_CONNECTIONS", "50"))
+
+# Connexions (ouvertes à la première requête, dans la boucle d'événements du serveur)
+mongo_client = AsyncIOMotorClient(MONGO_URI)
+db = mongo_client['guide_voyage']
+es = AsyncElasticsearch([ES_URL], retry_on_timeout=True, max_retries=3, maxsize=ES_CONNECTIONS)
+
+
+async def load_data_version():
+    """Version des données, incrémentée par l'import et la synchronisation"""
+    doc = await db['metadata'].find_one({'_id': 'data_version'}, {'version': 1})
+    return doc.get('version', 0) if doc else 0
+
+
+response_cache = AsyncVersionedCache(
+    load_data_version,
+    check_interval=float(os.getenv("DATA_VERSION_CHECK_SECONDS", "5"))
+)
+
+# Résultats de /api/search par requête normalisée (voir search_cache dans main.py)
+search_cache = AsyncQueryCache(
+    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "60"))
+)
+
+
+@app.after_serving
+async def close_clients():
+    await es.close()
+    mongo_client.close()
+
+
+def cached_json_response(entry):
+    """Réponse JSON avec ETag fort ; 304 sans corps si le client a déjà cette version"""
+    if request.if_none_match.contains(entry.etag):
+        response = Response('', status=304)
+    else:
+        response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+async def find_page(collection, query, params, required_fields=()):
+    """Page de documents triés par _id (voir queries.page_query)"""
+    query, projection, fetch = page_query(query, params, required_fields)
+    docs = await collection.find(query, projection).sort('_id', 1).to_list(fetch or None)
+    return split_page(docs, params)
+
+
+async def page_response(docs, next_cursor):
+    entry = CachedResponse(app.json.dumps(docs), await response_cache.current_version())
+    response = cached_json_response(entry)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+@app.route('/api/capitals', methods=['GET'])
+async def get_capitals():
+    try:
+        params = parse_list_params(request.args)
+        if params is not None:
+            capitales, next_cursor = await find_page(db['capitales'], {}, params, required_fields=CAPITAL_REQUIRED_FIELDS)
+            for cap in capitales:
+                add_display_fields(cap)
+            return await page_response(keep_fields(capitales, params['fields']), next_cursor)
+
+        version = await response_cache.current_version()
+        entry = response_cache.get('capitals', version)
+        if entry is None:
+            capitales = await db['capitales'].find({}, PUBLIC_PROJECTION).to_list(None)
+            for cap in capitales:
+                add_display_fields(cap)
+            entry = response_cache.set('capitals', app.json.dumps(capitales), version)
+        return cached_json_response(entry)
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Erreur Mongo: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+async def run_capital_search(query):
+    """Recherche Elasticsearch des capitales ; retourne le corps JSON sérialisé"""
+    res = await es.search(index="capitales", body=capital_search_body(query))
+    results = [hit["_source"] for hit in res["hits"]["hits"]]
+    for r in results:
+        add_display_fields(r)
+    return app.json.dumps(results)
+
+
+@app.route('/api/search', methods=['GET'])
+async def search():
+    query = normalize_search_query(request.args.get('q', ''))
+    if not query: return jsonify([])
+
+    try:
+        # Une seule recherche Elasticsearch pour une rafale de requêtes identiques
+        body, _ = await search_cache.get_or_compute(
+            query, await response_cache.current_version(), lambda: run_capital_search(query)
+        )
+        return Response(body, mimetype='application/json')
+    except Exception as e:
+        print(f"Erreur Elastic Search: {e}")
+        return jsonify([])
+
+
+@app.route('/api/restaurants/<city_name>', methods=['GET'])
+async def get_restaurants(city_name):
+    try:
+        query = restaurants_city_query(city_name)
+        params = parse_list_params(request.args)
+        if params is not None:
+            restos, next_cursor = await find_page(db['restaurants'], query, params)
+            return await page_response(restos, next_cursor)
+        restos = await db['restaurants'].find(query, PUBLIC_PROJECTION).to_list(None)
+        return jsonify(restos)
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Erreur Restaurants: {e}")
+        return jsonify([])
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.getenv("ASYNC_PORT", "5001")))
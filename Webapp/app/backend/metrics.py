@@ -0,0 +1,138 @@
+"""
+Métriques Prometheus de l'API (/metrics).
+
+- durée des requêtes HTTP par route, méthode et statut ;
+- taille des réponses envoyées (après compression) par route ;
+- durée de chaque commande MongoDB (find, getMore, aggregate...) par collection ;
+- durée des recherches Elasticsearch par index ;
+- succès / échecs des caches de réponses.
+
+Avec Gunicorn, PROMETHEUS_MULTIPROC_DIR doit pointer vers un dossier vide au
+démarrage : chaque worker y écrit ses valeurs et /metrics les agrège.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess,
+)
+from pymongo import monitoring
+
+
+REQUEST_LATENCY = Histogram(
+    'api_request_duration_seconds', "Durée des requêtes HTTP",
+    ['route', 'method', 'status'],
+)
+RESPONSE_SIZE = Histogram(
+    'api_response_size_bytes', "Taille des réponses envoyées (corps, après compression)",
+    ['route'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+MONGO_LATENCY = Histogram(
+    'mongo_command_duration_seconds', "Durée des commandes MongoDB",
+    ['collection', 'command', 'outcome'],
+)
+ES_LATENCY = Histogram(
+    'es_search_duration_seconds', "Durée des recherches Elasticsearch",
+    ['index', 'outcome'],
+)
+CACHE_REQUESTS = Counter(
+    'api_cache_requests_total', "Consultations des caches de réponses",
+    ['cache', 'result'],
+)
+
+# Routes non mesurées (la collecte elle-même)
+IGNORED_PATHS = {'/metrics'}
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Chronomètre chaque commande envoyée par le client Mongo (à passer dans event_listeners)"""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        # getMore désigne sa collection dans 'collection', les autres dans la valeur de la commande
+        if event.command_name == 'getMore':
+            collection = event.command.get('collection')
+        else:
+            collection = event.command.get(event.command_name)
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = (
+                collection if isinstance(collection, str) else ''
+            )
+
+    def _observe(self, event, outcome):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), '')
+        MONGO_LATENCY.labels(collection, event.command_name, outcome).observe(
+            event.duration_micros / 1e6
+        )
+
+    def succeeded(self, event):
+        self._observe(event, 'ok')
+
+    def failed(self, event):
+        self._observe(event, 'error')
+
+
+@contextmanager
+def track_es(index):
+    """Mesure un appel Elasticsearch sur `index`"""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        ES_LATENCY.labels(index, outcome).observe(time.perf_counter() - start)
+
+
+def record_cache(cache, result):
+    """Compte une consultation : result vaut 'hit', 'miss' ou 'coalesced'"""
+    CACHE_REQUESTS.labels(cache, result).inc()
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+def _observe_request(response):
+    start = g.pop('metrics_start', None)
+    if start is None or request.path in IGNORED_PATHS:
+        return response
+    # Modèle de la route (/api/restaurants/<city_name>) : pas un label par ville
+    route = request.url_rule.rule if request.url_rule else 'inconnue'
+    REQUEST_LATENCY.labels(route, request.method, str(response.status_code)).observe(
+        time.perf_counter() - start
+    )
+    # Réponses en flux : durée jusqu'aux en-têtes, taille inconnue à ce stade
+    if response.content_length is not None:
+        RESPONSE_SIZE.labels(route).observe(response.content_length)
+    return response
+
+
+def metrics_response():
+    """Exposition au format texte Prometheus, agrégée sur tous les workers si besoin"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """Branche la mesure des requêtes et la route /metrics
+
+    À appeler avant les autres hooks after_request : Flask les exécute dans
+    l'ordre inverse, la taille mesurée est donc celle envoyée sur le réseau.
+    """
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_response, methods=['GET'])
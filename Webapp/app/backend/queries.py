@@ -0,0 +1,198 @@
+"""
+Construction des requêtes Mongo / Elasticsearch et mise en forme des résultats.
+
+Partagé par l'API Flask (main.py) et l'API asynchrone (main_async.py) : les deux
+serveurs envoient exactement les mêmes requêtes, seul le client change.
+"""
+
+import base64
+import binascii
+import re
+from bson import ObjectId
+from bson.errors import InvalidId
+from utils import city_key, clean_city_name, get_city_coordinates
+
+
+# --- PAGINATION (curseur opaque sur _id) ET PROJECTION ---
+MAX_PAGE_SIZE = 500
+FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+# Champs techniques écrits par l'import, jamais renvoyés au client
+INTERNAL_FIELDS = ('content_hash', 'capitale_key')
+# Projection Mongo des listes complètes (sans _id ni champs internes)
+PUBLIC_PROJECTION = {'_id': 0, **{f: 0 for f in INTERNAL_FIELDS}}
+
+
+class BadRequest(ValueError):
+    """Paramètre de requête invalide (réponse 400)"""
+
+
+def encode_cursor(object_id):
+    return base64.urlsafe_b64encode(object_id.binary).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        return ObjectId(raw)
+    except (binascii.Error, InvalidId, TypeError, ValueError):
+        raise BadRequest("cursor invalide")
+
+
+def parse_list_params(args):
+    """Lit limit, cursor et fields ; retourne None si la requête n'en utilise aucun"""
+    if not any(k in args for k in ('limit', 'cursor', 'fields')):
+        return None
+
+    limit = args.get('limit')
+    if limit is not None:
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+            raise BadRequest(f"limit doit être compris entre 1 et {MAX_PAGE_SIZE}")
+        limit = int(limit)
+
+    cursor = args.get('cursor')
+    after = decode_cursor(cursor) if cursor else None
+
+    fields = None
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        if not all(FIELD_NAME.match(f) for f in fields):
+            raise BadRequest("fields invalide")
+
+    return {'limit': limit, 'after': after, 'fields': fields}
+
+
+def page_query(query, params, required_fields=()):
+    """(filtre, projection, nombre de documents à lire) d'une page triée par _id
+
+    On lit un document de plus que la page pour savoir s'il existe une suite
+    (0 : pas de limite).
+    """
+    if params['fields']:
+        projection = {
+            f: 1 for f in list(params['fields']) + list(required_fields)
+            if f not in INTERNAL_FIELDS
+        }
+        projection['_id'] = 1
+    else:
+        # _id est gardé pour le curseur, split_page le retire ensuite
+        projection = {f: 0 for f in INTERNAL_FIELDS}
+    if params['after'] is not None:
+        query = {'$and': [query, {'_id': {'$gt': params['after']}}]}
+    fetch = params['limit'] + 1 if params['limit'] else 0
+    return query, projection, fetch
+
+
+def split_page(docs, params):
+    """Coupe la page lue par page_query : (documents, curseur suivant ou None)"""
+    limit = params['limit']
+    next_cursor = None
+    if limit and len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]['_id'])
+    for d in docs:
+        d.pop('_id', None)
+    return docs, next_cursor
+
+
+def keep_fields(docs, fields):
+    """Ne garde que les champs demandés (utile pour les champs calculés)"""
+    if fields:
+        for d in docs:
+            for key in [k for k in d if k not in fields]:
+                del d[key]
+    return docs
+
+
+# --- CAPITALES ---
+# 'capitale' et 'location' servent à calculer nom affiché et coordonnées
+CAPITAL_REQUIRED_FIELDS = ('capitale', 'location')
+
+
+def location_lat_lon(location):
+    """(lat, lon) d'un point GeoJSON (Mongo) ou d'un geo_point {lat, lon} (Elasticsearch)"""
+    if 'coordinates' in location:
+        lon, lat = location['coordinates']
+        return lat, lon
+    return location['lat'], location['lon']
+
+
+def add_display_fields(cap):
+    """Ajoute le nom affiché et les coordonnées d'une capitale"""
+    nom_propre = clean_city_name(cap.get('capitale', ''))
+    cap['capitale_display'] = nom_propre
+
+    # Coordonnées stockées par l'import, sinon table de utils.py
+    location = cap.pop('location', None)
+    if location:
+        coords = location_lat_lon(location)
+    else:
+        coords = get_city_coordinates(nom_propre)
+    cap['lat'] = coords[0]
+    cap['lon'] = coords[1]
+    return cap
+
+
+def normalize_search_query(query):
+    """Forme canonique d'une recherche (clé du cache de /api/search)"""
+    return ' '.join(query.split()).casefold()
+
+
+def capital_search_body(query):
+    """Requête Elasticsearch de /api/search : préfixe de phrase puis correspondance floue"""
+    return {
+        "query": {
+            "bool": {
+                "should": [
+                    { "match_phrase_prefix": { "capitale": { "query": query, "boost": 10 } } },
+                    { "match": { "capitale": { "query": query, "fuzziness": "AUTO" } } }
+                ]
+            }
+        },
+        "_source": {"excludes": list(INTERNAL_FIELDS)}
+    }
+
+
+# --- BUNDLE DE VILLES (/api/cities/bundle) ---
+MAX_BUNDLE_CITIES = 30
+# capitale_key sert au regroupement : lu ici, retiré par assemble_bundle
+BUNDLE_PROJECTION = {'_id': 0, 'content_hash': 0}
+
+
+def bundle_keys(names):
+    """Associe à chaque nom demandé sa clé normalisée, dans l'ordre et sans doublon
+
+    `names` est la liste séparée par des virgules reçue en paramètre.
+    """
+    keys = {}
+    for name in (names or '').split(','):
+        if name.strip():
+            keys.setdefault(name.strip(), city_key(clean_city_name(name)))
+    if not keys:
+        raise BadRequest("names est requis")
+    if len(keys) > MAX_BUNDLE_CITIES:
+        raise BadRequest(f"au plus {MAX_BUNDLE_CITIES} villes par requête")
+    return keys
+
+
+def assemble_bundle(keys, capitales, restaurants):
+    """Regroupe par nom demandé la capitale (ou None) et ses restaurants"""
+    caps_by_key = {}
+    for cap in capitales:
+        caps_by_key[cap.pop('capitale_key', None)] = add_display_fields(cap)
+    restos_by_key = {}
+    for resto in restaurants:
+        restos_by_key.setdefault(resto.pop('capitale_key', None), []).append(resto)
+    return {
+        name: {'capitale': caps_by_key.get(key), 'restaurants': restos_by_key.get(key, [])}
+        for name, key in keys.items()
+    }
+
+
+# --- RESTAURANTS ---
+def restaurants_city_query(city_name):
+    """Filtre Mongo des restaurants d'une ville
+
+    On nettoie le nom reçu puis on cherche par égalité sur la clé normalisée
+    (indexée par l'import) : pas de regex, donc pas de parcours de collection.
+    """
+    return {"capitale_key": city_key(clean_city_name(city_name))}
@@ -0,0 +1,198 @@
+"""
+Sérialisation JSON rapide, compression négociée (gzip / brotli) et réponses
+JSON en flux pour l'API.
+
+L'encodeur est choisi par JSON_BACKEND ('orjson' si le module est installé,
+sinon 'json'). Les dates sont écrites en ISO 8601 quel que soit l'encodeur.
+"""
+
+import datetime
+import gzip
+import itertools
+import json
+import os
+import zlib
+from bson import ObjectId
+from flask import Response
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Pas de compression en dessous de cette taille (en octets) : le gain est nul
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# Taille approximative des blocs envoyés par les réponses en flux
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _default(value):
+    """Types que le module json ne sait pas écrire (orjson gère déjà les dates)"""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type {type(value).__name__} non sérialisable en JSON")
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=_default)
+
+
+# Encodeurs disponibles : nom -> fonction objet -> bytes UTF-8
+ENCODERS = {'json': _json_dumps}
+if orjson is not None:
+    ENCODERS['orjson'] = _orjson_dumps
+
+JSON_BACKEND = os.getenv("JSON_BACKEND", "orjson" if orjson is not None else "json")
+if JSON_BACKEND not in ENCODERS:
+    print(f"⚠️  Encodeur JSON '{JSON_BACKEND}' indisponible, utilisation de 'json'")
+    JSON_BACKEND = 'json'
+
+dumps_bytes = ENCODERS[JSON_BACKEND]
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Fournisseur JSON de Flask (jsonify, app.json.dumps) branché sur dumps_bytes"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype='application/json')
+
+
+# --- COMPRESSION ---
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encodings):
+    """Encodage à utiliser d'après Accept-Encoding (brotli de préférence), ou None"""
+    for encoding in supported_encodings():
+        if accept_encodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # mtime=0 : même entrée, même sortie (utile pour les réponses en cache)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Compression incrémentale : chaque bloc est vidé pour partir tout de suite"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits 16 + 15 : en-tête et pied de page gzip
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress_response(response, accept_encodings):
+    """Compresse une réponse JSON déjà construite (hook after_request)
+
+    Les réponses en flux et celles déjà encodées sont laissées telles quelles.
+    Un ETag fort devient faible : le contenu envoyé n'est plus octet pour octet
+    celui qui a servi à le calculer.
+    """
+    if (response.is_streamed or response.direct_passthrough
+            or response.status_code != 200
+            or 'Content-Encoding' in response.headers
+            or response.mimetype != 'application/json'):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.content_length is not None and response.content_length < COMPRESS_MIN_SIZE:
+        return response
+    encoding = negotiate_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# --- RÉPONSES EN FLUX ---
+def stream_json_array(items, encoding=None, chunk_size=STREAM_CHUNK_SIZE, close=None):
+    """Écrit un tableau JSON au fil de `items`, par blocs d'environ chunk_size octets
+
+    La mémoire utilisée dépend de chunk_size, pas du nombre d'éléments.
+    `close` est appelé à la fin, ou si le client coupe la connexion.
+    """
+    compressor = StreamCompressor(encoding) if encoding else None
+    try:
+        buffer = bytearray(b'[')
+        for i, item in enumerate(items):
+            if i:
+                buffer += b','
+            buffer += dumps_bytes(item)
+            if len(buffer) >= chunk_size:
+                yield compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+                buffer.clear()
+        buffer += b']'
+        if compressor:
+            yield compressor.compress(bytes(buffer)) + compressor.finish()
+        else:
+            yield bytes(buffer)
+    finally:
+        if close is not None:
+            close()
+
+
+def streamed_json_response(cursor, accept_encodings):
+    """Réponse chunked écrite directement depuis un curseur Mongo
+
+    Le premier document est lu avant de répondre : une erreur de connexion lève
+    ici (et peut devenir une 500) plutôt qu'au milieu du flux.
+    """
+    first = next(cursor, None)
+    items = [] if first is None else itertools.chain([first], cursor)
+    encoding = negotiate_encoding(accept_encodings)
+    response = Response(
+        stream_json_array(items, encoding, close=getattr(cursor, 'close', None)),
+        mimetype='application/json'
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,24 @@
+"""Percentiles du benchmark (rang le plus proche)
+
+Lancement (depuis Webapp/app/backend/) : python -m pytest tests
+"""
+
+from benchmark import percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5
+    assert percentile(values, 90) == 9
+    assert percentile(values, 95) == 10
+    assert percentile(values, 99) == 10
+    assert percentile(values, 100) == 10
+    assert percentile(values, 0) == 1
+
+
+def test_percentile_small_samples():
+    # round(0.95 * 30) = 28 donnait la 28e valeur au lieu de la 29e
+    values = list(range(1, 31))
+    assert percentile(values, 95) == 29
+    assert percentile([7], 99) == 7
+    assert percentile([], 95) == 0.0